@@ -0,0 +1,37 @@
+import os
+import threading
+
+import numpy as np
+
+
+def writeAtomically(write, path):
+    """
+    Call ``write(tmp_path)`` and move the finished file to ``path`` with ``os.replace``.
+
+    Readers see either the old file or the complete new one, never a truncated one. The
+    temp name is unique per process and thread, so workers building the same artifact at
+    once do not write into each other's file.
+
+    Args:
+        write (callable): Writes the whole file to the path it is given.
+        path (str): Final path.
+    """
+    tmp_path = "{}.tmp-{}-{}".format(path, os.getpid(), threading.get_ident())
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def saveArrayAtomically(path, array):
+    """
+    ``np.save`` ``array`` to ``path`` through ``writeAtomically``.
+    """
+    def write(tmp_path):
+        # Through a file handle: given a name, np.save would append ".npy" to the temp path
+        with open(tmp_path, "wb") as f:
+            np.save(f, array)
+
+    writeAtomically(write, path)
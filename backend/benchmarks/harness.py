@@ -0,0 +1,214 @@
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import resource
+import sys
+import time
+import types
+
+import httpx
+import numpy as np
+
+
+def loadApp(directory):
+    """
+    Import the API against the corpus in ``directory`` and run its warm-up synchronously.
+
+    Returns:
+        tuple: ``(main module, warm-up seconds)``.
+    """
+    os.environ["ERIC_DATA_DIR"] = directory
+    os.environ["ERIC_INDEX_PATH"] = os.path.join(directory, "eric_index.index")
+    try:
+        importlib.import_module("database.db_eric")
+    except ImportError:
+        # The ORM module is not in the tree; serve the corpus through a model of the same table
+        sys.modules["database"] = types.ModuleType("database")
+        sys.modules["database.db_eric"] = importlib.import_module("benchmarks.schema")
+    main = importlib.import_module("main")
+    startTime = time.perf_counter()
+    main.warmUp()
+    return main, time.perf_counter() - startTime
+
+
+def randomSubjects(rng, manifest, n=3):
+    return [manifest["subjects"][i] for i in rng.choice(len(manifest["subjects"]), size=n, replace=False)]
+
+
+def randomYears(rng, manifest):
+    start_year = int(rng.integers(manifest["first_year"], manifest["last_year"] + 1))
+    return start_year, int(rng.integers(start_year, manifest["last_year"] + 1))
+
+
+def dataRequest(rng, manifest, mode):
+    start_year, end_year = randomYears(rng, manifest)
+    params = {"skip": 20 * int(rng.integers(0, 50)), "limit": 20, "start_year": start_year, "end_year": end_year, "include_description": True}
+    return "GET", "/data", {"params": params}
+
+
+def countRequest(rng, manifest, mode):
+    start_year, end_year = randomYears(rng, manifest)
+    return "POST", "/count", {"json": {"subject_list": randomSubjects(rng, manifest), "start_year": start_year, "end_year": end_year}}
+
+
+def trainModelRequest(rng, manifest, mode):
+    liked = rng.choice(manifest["n_papers"], size=5, replace=False).tolist()
+    return "POST", "/trainModel", {"json": {"liked": liked, "session_id": "benchmark-train", "mode": mode, "seed": 0}}
+
+
+def getSuggestionsRequest(rng, manifest, mode):
+    params = {"skip": 20 * int(rng.integers(0, 10)), "limit": 20, "session_id": "benchmark"}
+    return "GET", "/getSuggestions", {"params": params}
+
+
+def clusterRequest(rng, manifest, mode):
+    return "POST", "/cluster", {"json": {"topics": randomSubjects(rng, manifest), "n_paper": 5, "seed": 0}}
+
+
+SCENARIOS = {
+    "data": dataRequest,
+    "count": countRequest,
+    "trainModel": trainModelRequest,
+    "getSuggestions": getSuggestionsRequest,
+    "cluster": clusterRequest,
+}
+
+
+def peakRssMb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def runScenario(app, requests, concurrency, n_warmup=5):
+    """
+    Send ``requests`` to the ASGI ``app`` in-process with at most ``concurrency`` in flight.
+
+    Args:
+        app: The FastAPI application.
+        requests (list): ``(method, url, kwargs)`` triples for ``httpx.AsyncClient.request``.
+        concurrency (int): Maximum number of requests in flight.
+        n_warmup (int, optional): Leading requests sent first and left out of the results. Defaults to 5.
+
+    Returns:
+        dict: Request count, errors, p50/p95/p99 latency, throughput and peak RSS.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        for method, url, kwargs in requests[:n_warmup]:
+            await client.request(method, url, **kwargs)
+
+        async def send(method, url, kwargs):
+            nonlocal errors
+            async with semaphore:
+                startTime = time.perf_counter()
+                response = await client.request(method, url, **kwargs)
+                latencies.append(time.perf_counter() - startTime)
+                errors += response.status_code >= 400
+
+        startTime = time.perf_counter()
+        await asyncio.gather(*(send(*request) for request in requests[n_warmup:]))
+        wall_seconds = time.perf_counter() - startTime
+
+    latencies_ms = 1000 * np.asarray(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "throughput_rps": len(latencies) / wall_seconds,
+        "peak_rss_mb": peakRssMb(),
+    }
+
+
+def runBenchmark(directory, scenarios=tuple(SCENARIOS), n_requests=200, concurrency=8, mode="forest", seed=0):
+    """
+    Drive the API endpoints against a synthetic corpus written by ``benchmarks.synthetic``.
+
+    Each scenario gets its own seeded request stream, so runs over the same corpus are
+    comparable. ``getSuggestions`` pages through a session trained once beforehand.
+
+    Returns:
+        dict: Corpus size, warm-up seconds and one result dict per scenario (see ``runScenario``).
+    """
+    with open(os.path.join(directory, "benchmark.json")) as f:
+        manifest = json.load(f)
+    main, warm_up_seconds = loadApp(directory)
+
+    results = {"n_papers": manifest["n_papers"], "warm_up_s": warm_up_seconds, "scenarios": {}}
+    for offset, name in enumerate(scenarios):
+        rng = np.random.default_rng([seed, offset])
+        if name == "getSuggestions":
+            liked = rng.choice(manifest["n_papers"], size=5, replace=False).tolist()
+            main.runTrainModel(main.TrainRequest(liked=liked, session_id="benchmark", mode=mode, seed=0))
+        requests = [SCENARIOS[name](rng, manifest, mode) for _ in range(n_requests + 5)]
+        results["scenarios"][name] = asyncio.run(runScenario(main.app, requests, concurrency))
+    return results
+
+
+def findErrors(results):
+    """
+    List the scenarios that had failed requests, as ``(name, errors, requests)`` tuples.
+    """
+    return [(name, result["errors"], result["requests"]) for name, result in results["scenarios"].items() if result["errors"]]
+
+
+def findRegressions(results, baseline, tolerance=0.2):
+    """
+    List the scenarios whose p95 latency grew by more than ``tolerance`` over ``baseline``.
+    """
+    regressions = []
+    for name, result in results["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if before and result["p95_ms"] > (1 + tolerance) * before["p95_ms"]:
+            regressions.append((name, before["p95_ms"], result["p95_ms"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the API in-process against a synthetic corpus.")
+    parser.add_argument("--corpus", required=True, help="Directory written by benchmarks.synthetic, e.g. benchmarks/corpus-100000")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--mode", default="forest", help="Recommender used by trainModel and getSuggestions")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Also write the results to this file")
+    parser.add_argument("--baseline", help="Results file of an earlier run to check for p95 regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = runBenchmark(args.corpus, args.scenarios, args.requests, args.concurrency, args.mode, args.seed)
+    print("{:,} papers, warm-up {:.1f} s".format(results["n_papers"], results["warm_up_s"]))
+    columns = ["requests", "errors", "p50_ms", "p95_ms", "p99_ms", "throughput_rps", "peak_rss_mb"]
+    print("{:>16}".format("scenario") + "".join("{:>16}".format(column) for column in columns))
+    for name, result in results["scenarios"].items():
+        print("{:>16}".format(name) + "".join(
+            "{:>16}".format(result[column] if isinstance(result[column], int) else "{:.2f}".format(result[column]))
+            for column in columns
+        ))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    # Failed requests are usually fast, so they would otherwise pass as a speed-up
+    errors = findErrors(results)
+    for name, n_errors, n_requests in errors:
+        print("ERRORS {}: {} of {} requests failed".format(name, n_errors, n_requests))
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = findRegressions(results, json.load(f), args.tolerance)
+        for name, before, after in regressions:
+            print("REGRESSION {}: p95 {:.2f} ms -> {:.2f} ms".format(name, before, after))
+    if errors or regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
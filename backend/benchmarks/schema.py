@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String
+from sqlalchemy.orm import declarative_base
+
+Base = declarative_base()
+
+
+class Papers(Base):
+    """
+    The ``papers`` table as the API reads it; used to serve synthetic corpora when the
+    ``database.db_eric`` module of a real deployment is not available.
+    """
+
+    __tablename__ = "papers"
+
+    id = Column(Integer, primary_key=True)
+    title = Column(String)
+    author = Column(String)
+    description = Column(String)
+    subject = Column(String)
+    publication_year = Column(Integer)
+    counts = Column(Integer)
@@ -0,0 +1,186 @@
+import argparse
+import json
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+from scripts.count_builder import SubjectCountBuilder, readSqlite
+from scripts.faiss_controller import INDEX_KINDS, FaissController, sqliteChunks
+
+PAPERS_DDL = """
+CREATE TABLE papers (
+    id INTEGER PRIMARY KEY,
+    title TEXT,
+    author TEXT,
+    description TEXT,
+    subject TEXT,
+    publication_year INTEGER,
+    counts INTEGER
+)
+"""
+
+
+def subjectName(subject_id):
+    return "synthetic subject {:04d}".format(subject_id)
+
+
+class SyntheticCorpus:
+    """
+    Generates a self-consistent fake ERIC corpus of any size.
+
+    Every subject owns a small vocabulary, and a paper's description is drawn from the
+    vocabularies of its subjects, so TF-IDF neighbours, forest suggestions and topic
+    clusters behave like the real data: papers sharing subjects are close in the index.
+    Subject popularity and citation counts are heavy-tailed. Rows are generated chunk by
+    chunk from per-chunk seeds, so memory stays bounded and a given seed always yields
+    the same corpus.
+    """
+
+    def __init__(self, n_papers, n_subjects=200, words_per_subject=5, words_per_paper=30, first_year=1950, last_year=2023, seed=0) -> None:
+        self.n_papers = n_papers
+        self.n_subjects = n_subjects
+        self.words_per_subject = words_per_subject
+        self.words_per_paper = words_per_paper
+        self.first_year = first_year
+        self.last_year = last_year
+        self.seed = seed
+        popularity = 1 / np.arange(1, n_subjects + 1) ** 0.8
+        self.popularity = popularity / popularity.sum()
+
+    @property
+    def subjects(self):
+        return [subjectName(i) for i in range(self.n_subjects)]
+
+    def rows(self, start, stop):
+        """
+        Generate the papers with ids in ``[start, stop)`` as tuples in ``papers`` column order.
+        """
+        rng = np.random.default_rng([self.seed, start])
+        n = stop - start
+        ids = np.arange(start, stop)
+        years = rng.integers(self.first_year, self.last_year + 1, size=n)
+        counts = (rng.pareto(1.2, size=n) * 10).astype(np.int64)
+        n_topics = rng.integers(1, 4, size=n)
+        topics = rng.choice(self.n_subjects, size=(n, 3), p=self.popularity)
+        # Each word comes from one of the paper's own subjects
+        word_topics = topics[np.arange(n)[:, None], rng.integers(0, n_topics[:, None], size=(n, self.words_per_paper))]
+        words = rng.integers(0, self.words_per_subject, size=(n, self.words_per_paper))
+        authors = rng.integers(0, max(1, self.n_papers // 10), size=n)
+
+        for i in range(n):
+            paper_topics = list(dict.fromkeys(topics[i, :n_topics[i]].tolist()))
+            description = " ".join("s{}w{}".format(t, w) for t, w in zip(word_topics[i].tolist(), words[i].tolist()))
+            yield (
+                int(ids[i]),
+                "Synthetic paper {} on {}".format(int(ids[i]), subjectName(paper_topics[0])),
+                "Author {:06d}".format(int(authors[i])),
+                description,
+                ",".join(subjectName(t) for t in paper_topics),
+                int(years[i]),
+                int(counts[i]),
+            )
+
+    def writeSqlite(self, path, chunksize=50000):
+        connection = sqlite3.connect(path)
+        try:
+            connection.execute("DROP TABLE IF EXISTS papers")
+            connection.execute(PAPERS_DDL)
+            for start in range(0, self.n_papers, chunksize):
+                connection.executemany(
+                    "INSERT INTO papers VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    self.rows(start, min(start + chunksize, self.n_papers)),
+                )
+                connection.commit()
+        finally:
+            connection.close()
+
+    def manifest(self):
+        return {
+            "n_papers": self.n_papers,
+            "n_subjects": self.n_subjects,
+            "first_year": self.first_year,
+            "last_year": self.last_year,
+            "seed": self.seed,
+            "subjects": self.subjects,
+        }
+
+
+def generateCorpus(directory, n_papers, kind="flat", max_features=1000, chunksize=50000, fit_size=200000, seed=0, **params):
+    """
+    Write a synthetic corpus laid out like the API's data directory.
+
+    Produces ``eric_database.db``, ``eric_index.index``, ``eric_vectorizer.joblib`` and
+    ``eric_counts.npz`` with the same scripts used for the real data, plus a
+    ``benchmark.json`` manifest the harness reads its request parameters from.
+
+    Args:
+        directory (str): Output directory, used as ``ERIC_DATA_DIR``.
+        n_papers (int): Number of papers.
+        kind (str, optional): FAISS index kind, one of ``INDEX_KINDS``. Defaults to "flat".
+        max_features (int, optional): TF-IDF vocabulary size. Defaults to 1000.
+        chunksize (int, optional): Rows generated, embedded and counted per chunk. Defaults to 50000.
+        fit_size (int, optional): Descriptions the vectorizer is fitted on. Defaults to 200000.
+        seed (int, optional): Corpus seed. Defaults to 0.
+
+    Returns:
+        dict: The manifest, including the seconds spent on each artifact.
+    """
+    os.makedirs(directory, exist_ok=True)
+    database_path = os.path.join(directory, "eric_database.db")
+    corpus = SyntheticCorpus(n_papers, seed=seed)
+    timings = {}
+
+    startTime = time.time()
+    corpus.writeSqlite(database_path, chunksize)
+    timings["database_s"] = time.time() - startTime
+
+    startTime = time.time()
+    controller = FaissController(max_features=max_features)
+    sample = []
+    for _, documents in sqliteChunks(database_path, "papers", chunksize):
+        sample.extend(documents[:fit_size - len(sample)])
+        if len(sample) >= fit_size:
+            break
+    controller.fitVectorizer(sample)
+    index = controller.newIndex(kind, **params)
+    controller.trainIndex(index, sqliteChunks(database_path, "papers", chunksize))
+    controller.addChunks(index, sqliteChunks(database_path, "papers", chunksize))
+    controller.save(index, os.path.join(directory, "eric_index.index"), os.path.join(directory, "eric_vectorizer.joblib"))
+    timings["index_s"] = time.time() - startTime
+
+    startTime = time.time()
+    builder = SubjectCountBuilder()
+    builder.addFrames(readSqlite(database_path, "papers", "publication_year", "subject", chunksize), "publication_year", "subject")
+    builder.save(os.path.join(directory, "eric_counts.npz"))
+    timings["counts_s"] = time.time() - startTime
+
+    manifest = dict(corpus.manifest(), kind=kind, **timings)
+    with open(os.path.join(directory, "benchmark.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic corpus for benchmarking the API.")
+    parser.add_argument("--papers", type=int, default=10000)
+    parser.add_argument("--output", help="Defaults to benchmarks/corpus-<papers>")
+    parser.add_argument("--kind", choices=INDEX_KINDS, default="flat")
+    parser.add_argument("--nlist", type=int, default=1024)
+    parser.add_argument("--max-features", type=int, default=1000)
+    parser.add_argument("--chunksize", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    output = args.output or "benchmarks/corpus-{}".format(args.papers)
+    params = {"nlist": args.nlist} if args.kind in ("ivf", "ivfpq") else {}
+    manifest = generateCorpus(output, args.papers, args.kind, args.max_features, args.chunksize, seed=args.seed, **params)
+    print(
+        "Wrote", "{:,}".format(args.papers), "papers to", output, "in",
+        "{:,.1f}".format(manifest["database_s"] + manifest["index_s"] + manifest["counts_s"]), "seconds",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+from metrics import metrics
+from subject_index import normalizeSubject
+from suggestions import topK
+
+
+class TopicClusterer:
+    """
+    Batched pipeline behind ``/cluster``.
+
+    One classifier per topic is trained on a thread pool (forest fitting and
+    ``predict_proba`` release the GIL), each topic contributes its ``n_paper`` best
+    papers, and the union of those candidates is scored by every topic model with a
+    single matrix ``predict_proba`` call per topic.
+
+    With a TopicModelCache, unseeded requests reuse each subject's fitted model and its
+    ``cache_top_k`` best papers; cached models are always fitted with seed 0.
+    """
+
+    def __init__(self, store, sampler, n_estimators=64, n_positive=100, max_workers=None, cache=None, cache_top_k=1000) -> None:
+        self.store = store
+        self.sampler = sampler
+        self.n_estimators = n_estimators
+        self.n_positive = n_positive
+        self.cache = cache
+        self.cache_top_k = cache_top_k
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="cluster")
+
+    def fitTopic(self, positive_ids, seed=None):
+        """
+        Fit a classifier separating a topic's papers from random negatives.
+
+        Args:
+            positive_ids (list): FAISS ids of papers tagged with the topic.
+            seed (int, optional): Seed for sub-sampling positives and sampling negatives. Defaults to None.
+
+        Returns:
+            RandomForestClassifier: The fitted model.
+        """
+        rng = np.random.default_rng(seed)
+        positive_ids = np.asarray(positive_ids, dtype=np.int64)
+        if len(positive_ids) > self.n_positive:
+            positive_ids = rng.choice(positive_ids, size=self.n_positive, replace=False)
+        with metrics.span("cluster.negative_sampling"):
+            negative_ids = self.sampler.sampleIds(positive_ids, len(positive_ids), seed=seed)
+        with metrics.span("cluster.embeddings"):
+            X = self.store.get(np.concatenate([positive_ids, negative_ids]))
+        y = [1] * len(positive_ids) + [0] * len(negative_ids)
+        model = RandomForestClassifier(n_estimators=self.n_estimators, random_state=42)
+        with metrics.span("cluster.fit"):
+            model.fit(X, y)
+        return model
+
+    def _fitAndRank(self, positive_ids, n_top, seed):
+        model = self.fitTopic(positive_ids, seed=seed)
+        with metrics.span("cluster.predict"):
+            scores = model.predict_proba(self.store.all())[:, 1]
+        return model, topK(scores, n_top)
+
+    def _fitAndSelect(self, topic, positive_ids, n_paper, seed):
+        if self.cache is None or seed is not None:
+            return self._fitAndRank(positive_ids, n_paper, seed)
+        n_top = max(n_paper, self.cache_top_k)
+        # Keyed like SubjectIndex.lookup, so spellings of one subject share a model
+        key = normalizeSubject(topic)
+        model, top_ids = self.cache.getOrBuild(key, lambda: self._fitAndRank(positive_ids, n_top, 0))
+        if len(top_ids) < min(n_paper, len(self.store)):
+            top_ids = topK(model.predict_proba(self.store.all())[:, 1], n_top)
+            self.cache.put(key, (model, top_ids))
+        return model, top_ids[:n_paper]
+
+    def cluster(self, topic_ids, n_paper, seed=None, on_progress=None):
+        """
+        Train the topic models and score the union of their best papers.
+
+        Args:
+            topic_ids (dict): Maps each topic to the FAISS ids of its papers. Topics without papers are skipped.
+            n_paper (int): Number of papers each topic contributes to the candidate set.
+            seed (int, optional): Seed for sampling. Defaults to None.
+            on_progress (callable, optional): Called with the fraction of topic models trained so far. Defaults to None.
+
+        Returns:
+            tuple: ``(topics, paper_ids, similarities)`` where ``similarities[i, j]`` is the
+            score of ``paper_ids[i]`` under the model of ``topics[j]``.
+        """
+        topics = [topic for topic, ids in topic_ids.items() if len(ids)]
+        futures = [self.executor.submit(self._fitAndSelect, topic, topic_ids[topic], n_paper, seed) for topic in topics]
+        if on_progress is not None:
+            for n_done, _ in enumerate(as_completed(futures), start=1):
+                on_progress(0.9 * n_done / len(futures))
+        fitted = [future.result() for future in futures]
+        if not fitted:
+            return [], np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float32)
+
+        paper_ids = np.unique(np.concatenate([selected for _, selected in fitted]))
+        if len(paper_ids) == 0:
+            return topics, paper_ids.astype(np.int64), np.empty((0, len(topics)), dtype=np.float32)
+        candidates = self.store.get(paper_ids)
+        with metrics.span("cluster.score"):
+            columns = self.executor.map(lambda model: model.predict_proba(candidates)[:, 1], [model for model, _ in fitted])
+            similarities = np.column_stack(list(columns)).astype(np.float32)
+        return topics, paper_ids, similarities
@@ -0,0 +1,168 @@
+import json
+import os
+
+import numpy as np
+
+from atomic_io import saveArrayAtomically
+from subject_index import normalizeSubject
+
+
+class SubjectCounts:
+    """
+    Yearly cumulative paper counts for every subject as one dense int32 matrix.
+
+    ``cumulative[y - first_year, s]`` is the number of papers tagged with subject ``s``
+    published before year ``y``, the same quantity ``eric_counts.json`` stores per
+    subject and stringified year. Counts over any list of subjects and year ranges are
+    answered with a single vectorized gather.
+
+    Columns are kept in sorted subject order so subjects are resolved with
+    ``np.searchsorted``; with ``save``/``loadMapped`` both arrays are memory-mapped and
+    loading parses nothing.
+    """
+
+    def __init__(self, subjects, first_year, cumulative) -> None:
+        subjects = np.asarray(subjects, dtype=str)
+        if np.any(subjects[:-1] > subjects[1:]):
+            order = np.argsort(subjects, kind="stable")
+            subjects = subjects[order]
+            cumulative = np.asarray(cumulative)[:, order]
+        self.subjects = subjects
+        self.first_year = int(first_year)
+        if isinstance(cumulative, np.memmap):
+            self.cumulative = cumulative
+        else:
+            self.cumulative = np.ascontiguousarray(cumulative, dtype=np.int32)
+
+    @classmethod
+    def fromDict(cls, freq_dict):
+        """
+        Convert the nested ``{subject: {year: cumulative count}}`` layout of ``eric_counts.json``.
+
+        Subjects that differ only in surrounding whitespace or case are merged.
+
+        Args:
+            freq_dict (dict): Parsed ``eric_counts.json``.
+
+        Returns:
+            SubjectCounts: The dense representation.
+        """
+        years = [int(year) for subject_freq in freq_dict.values() for year in subject_freq]
+        if not years:
+            return cls([], 0, np.zeros((1, 0), dtype=np.int32))
+        first_year, last_year = min(years), max(years)
+        subjects = sorted({normalizeSubject(subject) for subject in freq_dict})
+        subject_ids = {subject: i for i, subject in enumerate(subjects)}
+        cumulative = np.zeros((last_year - first_year + 1, len(subjects)), dtype=np.int32)
+        for subject, subject_freq in freq_dict.items():
+            column = subject_ids[normalizeSubject(subject)]
+            rows = np.fromiter((int(year) - first_year for year in subject_freq), dtype=np.int64, count=len(subject_freq))
+            values = np.fromiter(subject_freq.values(), dtype=np.int32, count=len(subject_freq))
+            cumulative[rows, column] += values
+        # The JSON only lists years after a subject first appears; carry the last count forward.
+        np.maximum.accumulate(cumulative, axis=0, out=cumulative)
+        return cls(subjects, first_year, cumulative)
+
+    @classmethod
+    def fromJson(cls, path):
+        with open(path) as f:
+            return cls.fromDict(json.load(f))
+
+    @classmethod
+    def fromHistogram(cls, subjects, first_year, histogram):
+        """
+        Build the cumulative matrix from per-year counts.
+
+        Args:
+            subjects (list): Subject names, one per histogram column.
+            first_year (int): Year of the first histogram row.
+            histogram (numpy.ndarray): ``(years, subjects)`` number of papers per year and subject.
+
+        Returns:
+            SubjectCounts: The dense representation.
+        """
+        histogram = np.asarray(histogram)
+        cumulative = np.zeros((histogram.shape[0] + 1, histogram.shape[1]), dtype=np.int32)
+        np.cumsum(histogram, axis=0, out=cumulative[1:])
+        return cls(subjects, first_year, cumulative)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a counts artifact written by ``scripts.count_builder``.
+        """
+        data = np.load(path, allow_pickle=False)
+        return cls.fromHistogram(data["subjects"], int(data["first_year"]), data["histogram"])
+
+    def save(self, directory):
+        """
+        Write the binary layout read by ``loadMapped``: ``subjects.npy``, ``cumulative.npy`` and ``first_year.npy``.
+        """
+        os.makedirs(directory, exist_ok=True)
+        saveArrayAtomically(os.path.join(directory, "subjects.npy"), self.subjects)
+        saveArrayAtomically(os.path.join(directory, "cumulative.npy"), self.cumulative)
+        # Written last: its presence and mtime mark a complete layout
+        saveArrayAtomically(os.path.join(directory, "first_year.npy"), np.int64(self.first_year))
+
+    @classmethod
+    def loadMapped(cls, directory):
+        """
+        Memory-map a directory written by ``save``.
+        """
+        return cls(
+            np.load(os.path.join(directory, "subjects.npy"), mmap_mode="r"),
+            int(np.load(os.path.join(directory, "first_year.npy"))),
+            np.load(os.path.join(directory, "cumulative.npy"), mmap_mode="r"),
+        )
+
+    @classmethod
+    def loadOrBuild(cls, directory, source_paths):
+        """
+        Memory-map ``directory``, converting it again from the first existing source artifact
+        (``.npz`` from ``scripts.count_builder`` or legacy ``.json``) when the directory is
+        missing or older than that source, e.g. after a ``--merge`` or a delta sync.
+        """
+        marker = os.path.join(directory, "first_year.npy")
+        source_path = next((path for path in source_paths if os.path.exists(path)), None)
+        if source_path is not None and (not os.path.exists(marker) or os.path.getmtime(marker) < os.path.getmtime(source_path)):
+            subject_counts = cls.load(source_path) if source_path.endswith(".npz") else cls.fromJson(source_path)
+            subject_counts.save(directory)
+        return cls.loadMapped(directory)
+
+    def subjectIds(self, subjects):
+        """
+        Map subjects to column ids, with -1 for subjects that have no counts.
+        """
+        if not len(self.subjects) or not len(subjects):
+            return np.full(len(subjects), -1, dtype=np.int64)
+        normalized = np.asarray([normalizeSubject(subject) for subject in subjects], dtype=str)
+        ids = np.minimum(np.searchsorted(self.subjects, normalized), len(self.subjects) - 1)
+        return np.where(self.subjects[ids] == normalized, ids, -1).astype(np.int64)
+
+    def _yearRows(self, years):
+        rows = np.asarray(years, dtype=np.int64) - self.first_year
+        return np.clip(rows, 0, self.cumulative.shape[0] - 1)
+
+    def countMany(self, subjects, start_years, end_years):
+        """
+        Count papers per subject between paired start and end years.
+
+        Args:
+            subjects (list): Subject names.
+            start_years (int or list): Start year, or one start year per subject.
+            end_years (int or list): End year, or one end year per subject.
+
+        Returns:
+            numpy.ndarray: int64 count per subject; 0 for unknown subjects.
+        """
+        ids = self.subjectIds(subjects)
+        starts = np.broadcast_to(self._yearRows(start_years), ids.shape)
+        ends = np.broadcast_to(self._yearRows(end_years), ids.shape)
+        known = ids >= 0
+        counts = np.zeros(len(ids), dtype=np.int64)
+        columns = ids[known]
+        counts[known] = self.cumulative[ends[known], columns].astype(np.int64) - self.cumulative[starts[known], columns]
+        return counts
+
+    def count(self, subjects, start_year, end_year):
+        return self.countMany(subjects, int(start_year), int(end_year))
@@ -0,0 +1,119 @@
+import os
+
+import faiss
+import numpy as np
+
+from atomic_io import saveArrayAtomically
+
+
+class EmbeddingStore:
+    """
+    Resident copy of every vector in the FAISS index as one contiguous float32 matrix.
+
+    Row ``i`` of the matrix is the vector stored under FAISS id ``i``, so scoring,
+    sampling and lookups can slice it with fancy indexing instead of calling
+    ``faiss_index.reconstruct`` once per paper.
+    """
+
+    def __init__(self, matrix) -> None:
+        if isinstance(matrix, np.memmap):
+            self.matrix = matrix
+        else:
+            self.matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+
+    @classmethod
+    def fromIndex(cls, index, cache_path=None, mmap=False, index_path=None):
+        """
+        Build the store from a FAISS index, reusing an on-disk copy when one exists.
+
+        Args:
+            index (faiss.Index): The index holding the corpus vectors.
+            cache_path (str, optional): ``.npy`` file the matrix is saved to and loaded from. Defaults to None.
+            mmap (bool, optional): Memory-map the cached matrix instead of reading it into RAM. Defaults to False.
+            index_path (str, optional): File the index was read from; a cache older than it is rebuilt. Defaults to None.
+
+        Returns:
+            EmbeddingStore: Store with one row per FAISS id.
+        """
+        if cache_path and os.path.exists(cache_path):
+            fresh = index_path is None or os.path.getmtime(cache_path) >= os.path.getmtime(index_path)
+            store = cls.load(cache_path, mmap=mmap)
+            if fresh and len(store) == indexSize(index) and store.dim == index.d:
+                return store
+        store = cls(indexVectors(index))
+        if cache_path:
+            store.save(cache_path)
+            if mmap:
+                return cls.load(cache_path, mmap=True)
+        return store
+
+    @classmethod
+    def load(cls, path, mmap=False):
+        """
+        Load a matrix previously written with ``save``.
+
+        Args:
+            path (str): Path of the ``.npy`` file.
+            mmap (bool, optional): Open the file read-only memory-mapped. Defaults to False.
+
+        Returns:
+            EmbeddingStore: The loaded store.
+        """
+        return cls(np.load(path, mmap_mode="r" if mmap else None))
+
+    def save(self, path):
+        saveArrayAtomically(path, self.matrix)
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    @property
+    def dim(self):
+        return self.matrix.shape[1]
+
+    def get(self, ids):
+        """
+        Return the vectors for the given FAISS ids as an ``(len(ids), dim)`` array.
+
+        Raises:
+            IndexError: If an id is negative or not below ``len(self)``; negative ids
+                would otherwise silently wrap around to the end of the matrix.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        if ids.size and (ids.min() < 0 or ids.max() >= len(self)):
+            raise IndexError("Paper id out of range [0, {}).".format(len(self)))
+        return self.matrix[ids]
+
+    def all(self):
+        return self.matrix
+
+
+def indexSize(index):
+    """
+    Return the number of rows needed to hold every id of ``index``.
+    """
+    if hasattr(index, "id_map"):
+        ids = faiss.vector_to_array(index.id_map)
+        return int(ids.max()) + 1 if ids.size else 0
+    return index.ntotal
+
+
+def indexVectors(index):
+    """
+    Read every vector out of ``index`` as a float32 matrix whose row ``i`` holds FAISS id ``i``.
+
+    ``IndexIDMap`` indexes are read from their inner index in one call and scattered
+    by id; rows of ids that are not in the map stay zero. IVF indexes get a direct map
+    so they can be reconstructed; PQ reconstructions are approximate.
+    """
+    inner = faiss.downcast_index(index.index) if hasattr(index, "id_map") else index
+    try:
+        faiss.extract_index_ivf(inner).make_direct_map()
+    except RuntimeError:
+        pass
+    if hasattr(index, "id_map"):
+        ids = faiss.vector_to_array(index.id_map)
+        matrix = np.zeros((indexSize(index), index.d), dtype=np.float32)
+        matrix[ids] = inner.reconstruct_n(0, index.ntotal)
+        return matrix
+    return index.reconstruct_n(0, index.ntotal)
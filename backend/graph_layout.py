@@ -0,0 +1,67 @@
+import numpy as np
+
+
+def topicAnchors(n_topics, radius=1.0):
+    """
+    Fixed topic positions, evenly spaced on a circle.
+    """
+    if n_topics == 1:
+        return np.zeros((1, 2))
+    angles = 2 * np.pi * np.arange(n_topics) / n_topics
+    return radius * np.column_stack([np.cos(angles), np.sin(angles)])
+
+
+def _repulsion(positions, reference, strength):
+    delta = positions[:, None, :] - reference[None, :, :]
+    distance2 = np.einsum("ijk,ijk->ij", delta, delta) + 1e-6
+    return strength / len(reference) * np.einsum("ijk,ij->ik", delta, 1 / distance2)
+
+
+def paperTopicLayout(scores, max_iter=300, tol=1e-4, repulsion=0.02, max_reference=1000, seed=0):
+    """
+    Lay out the paper-topic network of a ``/cluster`` result.
+
+    Topics are pinned to a circle, so the O(T^2) topic-topic repulsion of a spring layout is
+    not needed. Each paper is pulled towards the similarity-weighted mean of the topic anchors
+    and pushed away from the other papers, with all forces computed as array operations. The
+    step size cools linearly and the loop stops early once no paper moves more than ``tol``.
+
+    Args:
+        scores (numpy.ndarray): ``(n_papers, n_topics)`` similarity matrix, as returned by ``/cluster``.
+        max_iter (int, optional): Upper bound on the number of iterations. Defaults to 300.
+        tol (float, optional): Largest per-iteration move treated as converged. Defaults to 1e-4.
+        repulsion (float, optional): Strength of the paper-paper repulsion. Defaults to 0.02.
+        max_reference (int, optional): Papers repel a random sample of at most this many others,
+            which bounds each iteration to O(n_papers * max_reference). Defaults to 1000.
+        seed (int, optional): Seed of the initial jitter and the reference sample. Defaults to 0.
+
+    Returns:
+        tuple: ``(topic_positions, paper_positions)`` arrays of shape ``(n_topics, 2)`` and ``(n_papers, 2)``.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    n_papers, n_topics = scores.shape
+    anchors = topicAnchors(n_topics)
+    if n_papers == 0:
+        return anchors, np.zeros((0, 2))
+
+    # Sharpen the similarities so a paper sits close to the topics it matches best
+    weights = np.clip(scores, 0, None) ** 2
+    totals = weights.sum(axis=1, keepdims=True)
+    weights = np.where(totals > 0, weights / np.where(totals > 0, totals, 1), 1 / n_topics)
+    targets = weights @ anchors
+
+    rng = np.random.default_rng(seed)
+    positions = targets + rng.normal(scale=0.01, size=targets.shape)
+    for iteration in range(max_iter):
+        if n_papers > max_reference:
+            reference = positions[rng.choice(n_papers, size=max_reference, replace=False)]
+        else:
+            reference = positions
+        force = (targets - positions) + _repulsion(positions, reference, repulsion)
+        step = 0.1 * (1 - iteration / max_iter)
+        lengths = np.linalg.norm(force, axis=1, keepdims=True)
+        move = force * np.minimum(step, step / np.maximum(lengths, 1e-12))
+        positions += move
+        if np.abs(move).max() < tol:
+            break
+    return anchors, positions
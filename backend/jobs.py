@@ -0,0 +1,110 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import metrics
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    """
+    A long-running operation executed on the JobManager's worker pool.
+
+    The job function receives the Job itself, reports progress with ``update`` and calls
+    ``checkCancelled`` between stages so cancellation takes effect cooperatively.
+    """
+
+    def __init__(self, kind) -> None:
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = "queued"
+        self.progress = 0.0
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.future = None
+        self._cancelled = threading.Event()
+
+    def update(self, progress):
+        self.checkCancelled()
+        self.progress = float(progress)
+
+    def checkCancelled(self):
+        if self._cancelled.is_set():
+            raise JobCancelled()
+
+    def cancel(self):
+        self._cancelled.set()
+        if self.future is not None and self.future.cancel():
+            self.status = "cancelled"
+            self.finished_at = time.time()
+
+    @property
+    def done(self):
+        return self.status in ("succeeded", "failed", "cancelled")
+
+    def describe(self):
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": self.progress,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobManager:
+    """
+    Runs jobs on a bounded thread pool and keeps the most recent ``max_jobs`` of them for polling.
+    """
+
+    def __init__(self, max_workers=2, max_jobs=1000) -> None:
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _run(self, job, fn, args, kwargs):
+        if job.status == "cancelled":
+            return
+        job.status = "running"
+        try:
+            job.checkCancelled()
+            job.result = fn(job, *args, **kwargs)
+            job.progress = 1.0
+            job.status = "succeeded"
+        except JobCancelled:
+            job.status = "cancelled"
+        except Exception as e:
+            job.error = getattr(e, "detail", None) or repr(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+            metrics.observe("eric_job_seconds", job.finished_at - job.created_at, kind=job.kind, status=job.status)
+
+    def submit(self, kind, fn, *args, **kwargs):
+        """
+        Queue ``fn(job, *args, **kwargs)`` and return its Job.
+        """
+        job = Job(kind)
+        with self._lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.max_jobs:
+                oldest_id = next(iter(self._jobs))
+                if not self._jobs[oldest_id].done:
+                    break
+                del self._jobs[oldest_id]
+        job.future = self.executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
@@ -1,181 +1,413 @@
-import json
 import math
-import random
-from typing import List
+import os
+import threading
+import time
+from typing import List, Optional
 
-import faiss
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+import numpy as np
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pydantic import BaseModel, Field
 
 ############################################## MODEL ################################################
-from sklearn.ensemble import RandomForestClassifier
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from database.db_eric import Papers
+from graph_layout import paperTopicLayout
+from jobs import JobManager
+from metrics import SamplingProfiler, metrics
+from serialization import PAPER_FIELDS, FastJSONResponse, paperFields
+from suggestions import SuggestionStore, likedSetKey
 from utils import *
 
-faiss_index = faiss.read_index("database/eric_index.index")
+DATA_DIR = os.environ.get("ERIC_DATA_DIR", "database")
+PROFILING = os.environ.get("ERIC_PROFILING") == "1"
+PROFILE_DIR = os.environ.get("ERIC_PROFILE_DIR", "profiles")
+INDEX_PATH = os.environ.get("ERIC_INDEX_PATH", os.path.join(DATA_DIR, "eric_index.index"))
 
-classifier = RandomForestClassifier(n_estimators=100, random_state=42)
+DATABASE_PATH = os.path.join(DATA_DIR, "eric_database.db")
 
-current_suggestions = []
+db_url = "sqlite:///" + DATABASE_PATH
+engine = create_engine(db_url)
+Session = sessionmaker(bind=engine)
 
+suggestion_store = SuggestionStore(max_sessions=256, ttl=3600)
+# Results shared across sessions, keyed by liked set and settings; kept short so reused results stay fresh in the session store
+suggestion_cache = SuggestionStore(max_sessions=64, ttl=600)
+job_manager = JobManager(max_workers=2)
 
-with open ('database/eric_counts.json') as f:
-    frequency_dict = json.load(f)
+readiness = {"ready": False, "stage": "starting", "error": None, "seconds": None}
 
-db_url = "sqlite:///database/eric_database.db"
-engine = create_engine(db_url)
-Session = sessionmaker(bind=engine)
-app = FastAPI()
+
+def warmUp():
+    """
+    Import the heavy modules and load the index, embeddings, counts and lookup tables.
+
+    Runs on a background thread at startup so the server accepts connections at once;
+    ``/ready`` reports when it has finished.
+    """
+    global faiss_index, embedding_store, negative_sampler, recommenders, topic_clusterer
+    global subject_counts, publication_years, paper_search, subject_index, paper_metadata
+
+    startTime = time.time()
+    readiness["stage"] = "index"
+    import joblib
+
+    from clustering import TopicClusterer
+    from counts import SubjectCounts
+    from embedding_store import EmbeddingStore
+    from paper_metadata import PaperMetadata
+    from recommenders import CentroidRecommender, ForestRecommender, IncrementalRecommender, KnnRecommender
+    from sampling import NegativeSampler
+    from scripts.faiss_controller import readIndex, setSearchParameters
+    from search import PaperSearch
+    from subject_index import SubjectIndex
+    from topic_cache import TopicModelCache, indexFingerprint
+
+    faiss_index = readIndex(INDEX_PATH, mmap=True)
+    setSearchParameters(faiss_index, nprobe=int(os.environ.get("ERIC_NPROBE", 32)), ef_search=int(os.environ.get("ERIC_EF_SEARCH", 128)))
+    readiness["stage"] = "embeddings"
+    embedding_store = EmbeddingStore.fromIndex(faiss_index, cache_path=os.path.join(DATA_DIR, "eric_embeddings.npy"), mmap=True, index_path=INDEX_PATH)
+    negative_sampler = NegativeSampler(embedding_store)
+
+    recommenders = {
+        "forest": ForestRecommender(embedding_store, negative_sampler),
+        "centroid": CentroidRecommender(faiss_index, embedding_store, negative_sampler),
+        "knn": KnnRecommender(faiss_index, embedding_store),
+        "incremental": IncrementalRecommender(embedding_store, negative_sampler),
+    }
+    topic_model_cache = TopicModelCache(os.path.join(DATA_DIR, "topic_models"), indexFingerprint(INDEX_PATH, faiss_index))
+    topic_clusterer = TopicClusterer(embedding_store, negative_sampler, cache=topic_model_cache)
+
+    readiness["stage"] = "counts"
+    # Converted to the memory-mapped layout once per update of the source artifact
+    counts_path = os.path.join(DATA_DIR, "eric_counts")
+    subject_counts = SubjectCounts.loadOrBuild(counts_path, [counts_path + ".npz", counts_path + ".json"])
+
+    readiness["stage"] = "database"
+    startup_session = Session()
+    readiness["stage"] = "metadata"
+    paper_metadata = PaperMetadata.loadOrBuild(os.path.join(DATA_DIR, "eric_metadata"), startup_session, Papers, len(embedding_store), source_path=DATABASE_PATH)
+    publication_years = paper_metadata.years[:len(embedding_store)]
+    # Only /search needs the vectorizer; deployments built before it was saved serve everything else
+    vectorizer_path = os.path.join(DATA_DIR, "eric_vectorizer.joblib")
+    vectorizer = joblib.load(vectorizer_path) if os.path.exists(vectorizer_path) else None
+    paper_search = PaperSearch(faiss_index, embedding_store, vectorizer, publication_years)
+    subject_index = SubjectIndex.loadOrBuild(os.path.join(DATA_DIR, "eric_subjects.npz"), startup_session, Papers, source_path=DATABASE_PATH)
+    startup_session.close()
+
+    readiness.update(ready=True, stage="ready", seconds=time.time() - startTime)
+
+
+def runWarmUp():
+    try:
+        warmUp()
+    except Exception as e:
+        readiness.update(stage="failed", error=repr(e))
+        raise
+
+app = FastAPI(default_response_class=FastJSONResponse)
+
+@app.on_event("startup")
+def startWarmUp():
+    threading.Thread(target=runWarmUp, name="warm-up", daemon=True).start()
+
+@app.middleware("http")
+async def requireReady(request: Request, call_next):
+    if not readiness["ready"] and request.url.path not in ("/ready", "/metrics", "/docs", "/openapi.json"):
+        return JSONResponse(status_code=503, content={"detail": "Service is warming up.", "stage": readiness["stage"]})
+    return await call_next(request)
+
+@app.middleware("http")
+async def recordMetrics(request: Request, call_next):
+    # Opt-in sampling profile of one request, e.g. GET /data?profile=1 or an "X-Profile: 1" header
+    profiler = None
+    if PROFILING and "1" in (request.headers.get("x-profile"), request.query_params.get("profile")):
+        profiler = SamplingProfiler().start()
+    startTime = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    path = route.path if route is not None else "unmatched"
+    metrics.observe("eric_request_seconds", time.perf_counter() - startTime, method=request.method, path=path, status=response.status_code)
+    if profiler is not None:
+        profiler.stop()
+        response.headers["X-Profile-File"] = profiler.dump(PROFILE_DIR, request.method + path.replace("/", "_"))
+    return response
+
+@app.get("/ready")
+async def ready():
+    return JSONResponse(status_code=200 if readiness["ready"] else 503, content=readiness)
+
+@app.get("/metrics")
+async def metricsText():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+LIST_FIELDS = ["id", "title", "author", "subject", "publication_year", "counts"]
+
+def topPapersPage(skip, limit, start_year, end_year, after_counts=None, after_id=None, include_description=False, fields=None):
+    default = LIST_FIELDS + ["description"] if include_description else LIST_FIELDS
+    names = paperFields(fields, default, required=("id", "counts"))
+    # Keyset pagination resumes right after the last (counts, id) of the previous page
+    after = (after_counts, after_id) if after_counts is not None and after_id is not None else None
+    with metrics.span("metadata.data"):
+        page_ids = paper_metadata.topPage(start_year, end_year, skip, limit, after)
+        data = paper_metadata.rows(page_ids, names)
+    next_cursor = None
+    if data and len(data) == limit:
+        # From the array rather than the row: papers with NULL counts sort as -1, and a null cursor would restart the scan
+        last_id = data[-1]["id"]
+        next_cursor = {"after_counts": int(paper_metadata.counts[last_id]), "after_id": last_id}
+    return {"data": data, "next_cursor": next_cursor}
 
 @app.get("/data")
-async def root(skip: int = 0, limit: int = 20, start_year: int = 1950, end_year: int = 2023):
-    session = Session()
-    data = session.query(Papers).filter(Papers.publication_year >= start_year, Papers.publication_year <= end_year).order_by(Papers.counts.desc()).offset(skip).limit(limit).all()
-    session.close()
-    return {"data": data}
+def root(
+    skip: int = 0,
+    limit: int = 20,
+    start_year: int = 1950,
+    end_year: int = 2023,
+    after_counts: Optional[int] = None,
+    after_id: Optional[int] = None,
+    include_description: bool = False,
+    fields: Optional[str] = None,
+):
+    return FastJSONResponse(topPapersPage(skip, limit, start_year, end_year, after_counts, after_id, include_description, fields))
+
 class CountRequest(BaseModel):
     subject_list: List[str]
-    start_year: str = 1950
-    end_year: str = 2023
+    start_year: int = 1950
+    end_year: int = 2023
 # Define the endpoint
 @app.post("/count")
 async def count(request: CountRequest):
-    res = {}
-    for subject in request.subject_list:
-        count = getCount(frequency_dict, subject, request.start_year, request.end_year)
-        res[subject] = count
+    counts = subject_counts.count(request.subject_list, request.start_year, request.end_year)
+    return dict(zip(request.subject_list, counts.tolist()))
+
+class CountBatchRequest(BaseModel):
+    queries: List[CountRequest]
+
+@app.post("/countBatch")
+async def count_batch(request: CountBatchRequest):
+    subjects = [subject for query in request.queries for subject in query.subject_list]
+    start_years = [query.start_year for query in request.queries for _ in query.subject_list]
+    end_years = [query.end_year for query in request.queries for _ in query.subject_list]
+    counts = subject_counts.countMany(subjects, start_years, end_years).tolist()
+    res = []
+    offset = 0
+    for query in request.queries:
+        res.append(dict(zip(query.subject_list, counts[offset:offset + len(query.subject_list)])))
+        offset += len(query.subject_list)
     return res
 
 
 class TrainRequest(BaseModel):
     liked: List[int]
+    seed: Optional[int] = None
+    session_id: str = "default"
+    mode: str = "forest"
+    k: int = Field(default=1000, gt=0)
 
-@app.post("/trainModel")
-async def trainModel(request: TrainRequest):
-    global current_suggestions
-    
-    # Reconstruct embeddings for liked and not liked papers
-    liked_embeddings = [faiss_index.reconstruct(i) for i in request.liked]
-    not_liked_embeddings = [faiss_index.reconstruct(i) for i in range(faiss_index.ntotal) if i not in request.liked]
-    n_not_liked = 1000
-    random_not_liked = random.sample(not_liked_embeddings, n_not_liked)
-    # Combine embeddings and labels
-    X = liked_embeddings + random_not_liked
-    y = [1] * len(liked_embeddings) + [0] * len(random_not_liked)
-    
-    # Train the classifier
-    classifier.fit(X, y)
-    
-    # Reconstruct all embeddings for scoring
-    all_embeddings = [faiss_index.reconstruct(i) for i in range(faiss_index.ntotal)]
-    
-    # Predict scores for all embeddings
-    scores = classifier.predict_proba(all_embeddings)[:, 1]
-    
-    # Create suggestions with scores
-    current_suggestions = [(i, score) for i, score in enumerate(scores)]
+def validateTrainRequest(request):
+    if request.mode not in recommenders:
+        raise HTTPException(status_code=400, detail=f"Unknown mode '{request.mode}'. Choose one of {list(recommenders)}.")
+    if not request.liked:
+        raise HTTPException(status_code=400, detail="Like at least one paper before running the suggestion algorithm.")
+    if any(i < 0 or i >= len(embedding_store) for i in request.liked):
+        raise HTTPException(status_code=404, detail="Unknown paper id.")
+
+def runTrainModel(request, job=None):
+    validateTrainRequest(request)
     
-    # Sort suggestions by score in descending order
-    current_suggestions.sort(key=lambda x: x[1], reverse=True)
+    # Reuse the result of an identical liked set, or score the corpus with the selected recommender
+    key = likedSetKey(request.liked, mode=request.mode, k=request.k, seed=request.seed)
+    suggestion_session = suggestion_cache.get(key)
+    if suggestion_session is None:
+        previous = suggestion_store.get(request.session_id)
+        on_progress = job.update if job is not None else None
+        suggestion_session = recommenders[request.mode].recommend(request.liked, k=request.k, seed=request.seed, previous=previous, on_progress=on_progress)
+        suggestion_cache.put(key, suggestion_session)
+    if job is not None:
+        job.update(0.9)
+    suggestion_store.put(request.session_id, suggestion_session)
     
     # Return the top 10 suggestions
-    return {"message": "Model trained successfully", "suggestions": current_suggestions[:10]}
+    return {"message": "Model trained successfully", "suggestions": suggestion_session.top(10)}
 
+@app.post("/trainModel")
+def trainModel(request: TrainRequest):
+    return FastJSONResponse(runTrainModel(request))
 
 
 
-@app.get("/getSuggestions")
-async def get_suggestions(skip: int = 0, limit: int = 20, start_year: int = 1950, end_year: int = 2023):
-    global current_suggestions
-    if not current_suggestions:
+
+def suggestionsPage(skip, limit, start_year, end_year, session_id="default", fields=None):
+    suggestion_session = suggestion_store.get(session_id)
+    if suggestion_session is None:
         raise HTTPException(status_code=400, detail="No suggestions available. Please train the model first.")
     
-    session = Session()
-    suggestion_ids = [i[0] for i in current_suggestions]
-    
-    # Retrieve data from the database
-    suggested_data = session.query(Papers).filter(
-        Papers.publication_year >= start_year,
-        Papers.publication_year <= end_year,
-        Papers.id.in_(suggestion_ids)
-    ).all()
+    scores = suggestion_session.scores
+    page_ids = suggestion_session.page(publication_years, start_year, end_year, skip, limit)
     
-    if not suggested_data:
+    if len(page_ids) == 0:
         raise HTTPException(status_code=404, detail="No suggestions found for the given criteria.")
     
-    # Create a mapping from suggestion ID to its score
-    id_to_score = {i[0]: i[1] for i in current_suggestions}
-    
-    # Sort the data based on the order in current_suggestions and attach scores
-    suggested_data_sorted = sorted(suggested_data, key=lambda x: id_to_score[x.id], reverse=True)
-    
-    # Apply pagination
-    suggested_data_paginated = suggested_data_sorted[skip:skip + limit]
+    # Retrieve only the requested columns of the papers of the requested page, in score order
+    names = paperFields(fields, PAPER_FIELDS)
+    with metrics.span("metadata.suggestions"):
+        results_with_scores = paper_metadata.rows(page_ids, names)
+    for paper in results_with_scores:
+        paper["score"] = float(scores[paper["id"]])
     
-    # Attach scores to the results
-    results_with_scores = [
-        {
-            "id": paper.id,
-            "title": paper.title,
-            "author": paper.author,
-            "description": paper.description,
-            "subject": paper.subject,
-            "publication_year": paper.publication_year,
-            "counts": paper.counts,
-            "score": id_to_score[paper.id]
-        }
-        for paper in suggested_data_paginated
-    ]
-    
-    session.close()
     return {"data": results_with_scores}
 
+@app.get("/getSuggestions")
+def get_suggestions(skip: int = 0, limit: int = 20, start_year: int = 1950, end_year: int = 2023, session_id: str = "default", fields: Optional[str] = None):
+    return FastJSONResponse(suggestionsPage(skip, limit, start_year, end_year, session_id, fields))
+
+def attachSubjectCounts(papers, start_year, end_year):
+    # One gather for the subjects of every paper on the page
+    subject_lists = [paper["subject"].split(",") if paper.get("subject") else [] for paper in papers]
+    with metrics.span("counts.page"):
+        counts = subject_counts.count([subject for subjects in subject_lists for subject in subjects], start_year, end_year).tolist()
+    offset = 0
+    for paper, subjects in zip(papers, subject_lists):
+        paper["subject_counts"] = dict(zip(subjects, counts[offset:offset + len(subjects)]))
+        offset += len(subjects)
+    return papers
+
+@app.get("/page")
+def page(
+    view: str = "top",
+    skip: int = 0,
+    limit: int = 20,
+    start_year: int = 1950,
+    end_year: int = 2023,
+    session_id: str = "default",
+    fields: Optional[str] = None,
+):
+    if view == "top":
+        result = topPapersPage(skip, limit, start_year, end_year, include_description=True, fields=fields)
+    elif view == "suggestions":
+        result = suggestionsPage(skip, limit, start_year, end_year, session_id, fields)
+    else:
+        raise HTTPException(status_code=400, detail="view must be 'top' or 'suggestions'.")
+    attachSubjectCounts(result["data"], start_year, end_year)
+    return FastJSONResponse(result)
+
+class PapersRequest(BaseModel):
+    ids: List[int]
+    start_year: int = 1950
+    end_year: int = 2023
+    fields: Optional[str] = None
+
+@app.post("/papers")
+def papers(request: PapersRequest):
+    names = paperFields(request.fields, PAPER_FIELDS)
+    with metrics.span("metadata.papers"):
+        data = paper_metadata.rows(request.ids, names)
+    return FastJSONResponse({"data": attachSubjectCounts(data, request.start_year, request.end_year)})
+
 class ClusterRequest(BaseModel):
     topics: List[str]
-    n_paper: int
+    n_paper: int = Field(gt=0)
+    seed: Optional[int] = None
+    layout_iterations: int = 300
+
+def runCluster(request, job=None):
+    topic_ids = {topic: subject_index.lookup(topic) for topic in request.topics}
+    on_progress = job.update if job is not None else None
+    topics, paper_ids, scores = topic_clusterer.cluster(topic_ids, request.n_paper, seed=request.seed, on_progress=on_progress)
+    
+    # Compact form: paper metadata once, and scores[i][j] for papers[i] under topics[j]
+    rows = np.flatnonzero(paper_metadata.present[paper_ids])
+    with metrics.span("metadata.cluster"):
+        papers = paper_metadata.rows(paper_ids[rows], ["id", "title", "author"])
+    with metrics.span("cluster.layout"):
+        topic_positions, paper_positions = paperTopicLayout(scores[rows], max_iter=min(request.layout_iterations, 5000))
+    return {
+        "topics": topics,
+        "papers": papers,
+        "scores": scores[rows].tolist(),
+        "layout": {"topics": topic_positions.tolist(), "papers": paper_positions.tolist()},
+    }
 
 @app.post("/cluster")
-async def cluster(request: ClusterRequest):
-    global faiss_index
-    idxs = []
-    models = {}
-    similarities = {}
-    session = Session()
-    for topic in request.topics:
-        classifier = RandomForestClassifier(n_estimators=64, random_state=42)
-        papers = session.query(Papers).filter(
-            Papers.subject.ilike(f'%{topic}%')
-        ).all()
-        if papers == []:
-            continue
-        ids = [paper.id for paper in papers]
-        ids = random.sample(ids, min(len(ids), 100))
-        x = [faiss_index.reconstruct(i) for i in ids] + random.sample([faiss_index.reconstruct(i) for i in range(faiss_index.ntotal) if i not in ids], len(ids))
-        y = [1] * len(ids) + [0] * (len(ids))
-        classifier.fit(x, y)
-        year_indexes = session.query(Papers).filter(Papers.publication_year >= 1950, Papers.publication_year <= 2023).all()
-        scores = classifier.predict_proba([faiss_index.reconstruct(i) for i in range(faiss_index.ntotal)])[:, 1]
-        suggestions = [(i, score) for i, score in enumerate(scores)]
-        suggestions.sort(key=lambda x: x[1], reverse=True)
-        paper_each = request.n_paper
-        idxs.append([i[0] for i in suggestions[:paper_each]])
-        models[topic] = classifier
-    for topic, model in models.items():
-        for idx_list in idxs:  # Iterate over lists of indices
-            for idx in idx_list:
-                paper = session.query(Papers).filter(Papers.id == idx).first()
-                title = paper.title
-                author = paper.author
-                title_author = title + "###" + author
-                if title_author not in similarities:
-                    similarities[title_author] = {}  # Initialize the dictionary for this index if it doesn't exist
-                similarity_score = (model.predict_proba([faiss_index.reconstruct(idx)])[:, 1][0])
-                # adjusted_similarity_score = math.log(1 + similarity_score)
-                similarities[title_author][topic] = similarity_score
-    session.close()
-    return similarities
-
-    
\ No newline at end of file
+def cluster(request: ClusterRequest):
+    return FastJSONResponse(runCluster(request))
+
+############################################## JOBS ################################################
+
+@app.post("/jobs/trainModel")
+async def submit_train_model(request: TrainRequest):
+    # Reject bad input now rather than as a failed job
+    validateTrainRequest(request)
+    return job_manager.submit("trainModel", lambda job: runTrainModel(request, job)).describe()
+
+@app.post("/jobs/cluster")
+async def submit_cluster(request: ClusterRequest):
+    return job_manager.submit("cluster", lambda job: runCluster(request, job)).describe()
+
+def getJob(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job id.")
+    return job
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    return getJob(job_id).describe()
+
+@app.get("/jobs/{job_id}/result")
+async def job_result(job_id: str):
+    job = getJob(job_id)
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=job.error)
+    if job.status == "cancelled":
+        raise HTTPException(status_code=410, detail="Job was cancelled.")
+    if not job.done:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}.")
+    return FastJSONResponse(job.result)
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    job = getJob(job_id)
+    job.cancel()
+    return job.describe()
+
+
+def searchResults(results):
+    fields = ["id", "title", "author", "subject", "publication_year"]
+    data = []
+    for ids, scores in results:
+        keep = paper_metadata.present[ids]
+        papers = paper_metadata.rows(ids[keep], fields)
+        for paper, score in zip(papers, scores[keep].tolist()):
+            paper["score"] = score
+        data.append(papers)
+    return data
+
+class SearchRequest(BaseModel):
+    queries: List[str]
+    k: int = Field(default=20, gt=0)
+    start_year: int = 1950
+    end_year: int = 2023
+
+@app.post("/search")
+def search(request: SearchRequest):
+    if paper_search.vectorizer is None:
+        raise HTTPException(status_code=503, detail="Vectorizer not built. Run scripts/faiss_controller.py to enable text search.")
+    results = paper_search.searchText(request.queries, request.k, request.start_year, request.end_year)
+    return FastJSONResponse({"results": searchResults(results)})
+
+class SimilarRequest(BaseModel):
+    paper_ids: List[int]
+    k: int = Field(default=20, gt=0)
+    start_year: int = 1950
+    end_year: int = 2023
+
+@app.post("/similar")
+def similar(request: SimilarRequest):
+    if any(i < 0 or i >= len(embedding_store) for i in request.paper_ids):
+        raise HTTPException(status_code=404, detail="Unknown paper id.")
+    results = paper_search.similar(request.paper_ids, request.k, request.start_year, request.end_year)
+    return FastJSONResponse({"results": searchResults(results)})
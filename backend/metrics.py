@@ -0,0 +1,163 @@
+import math
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, math.inf)
+
+
+class Histogram:
+    """
+    Latency histogram with fixed upper bounds, rendered as cumulative Prometheus buckets.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _labelText(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ""
+    escape = lambda value: str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join('{}="{}"'.format(name, escape(value)) for name, value in pairs) + "}"
+
+
+class MetricsRegistry:
+    """
+    Thread-safe set of labelled histograms, exposed in the Prometheus text format.
+
+    Request handlers, job threads and the cluster pool all record into the module-level
+    ``metrics`` instance; ``span`` times one stage of a hot path, such as negative
+    sampling, forest fitting, ``predict_proba``, SQL or serialization.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        self._histograms = {}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name, help_text):
+        self._help[name] = help_text
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    @contextmanager
+    def span(self, stage):
+        """
+        Record the time spent in the ``with`` block under ``eric_stage_seconds{stage=...}``.
+        """
+        startTime = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("eric_stage_seconds", time.perf_counter() - startTime, stage=stage)
+
+    def render(self):
+        """
+        Return every histogram in the Prometheus text exposition format.
+        """
+        with self._lock:
+            snapshot = [(name, labels, list(h.counts), h.sum, h.count) for (name, labels), h in sorted(self._histograms.items(), key=lambda item: (item[0][0], str(item[0][1])))]
+        lines = []
+        previous_name = None
+        for name, labels, counts, total, count in snapshot:
+            if name != previous_name:
+                if name in self._help:
+                    lines.append("# HELP {} {}".format(name, self._help[name]))
+                lines.append("# TYPE {} histogram".format(name))
+                previous_name = name
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = "+Inf" if math.isinf(bound) else repr(bound)
+                lines.append("{}_bucket{} {}".format(name, _labelText(labels, le=le), cumulative))
+            lines.append("{}_sum{} {!r}".format(name, _labelText(labels), total))
+            lines.append("{}_count{} {}".format(name, _labelText(labels), count))
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+metrics.describe("eric_request_seconds", "HTTP request latency by route and status.")
+metrics.describe("eric_stage_seconds", "Time spent in each stage of the training, clustering and serving paths.")
+metrics.describe("eric_job_seconds", "Run time of background jobs by kind and final status.")
+
+
+# Innermost frames of threads that are parked rather than working
+IDLE_FILES = ("threading.py", "queue.py", "selectors.py")
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler that samples the Python stack of every other thread at a fixed interval.
+
+    The result is in the collapsed-stack format (``outer;inner count`` per line) read by
+    ``flamegraph.pl`` and speedscope. Parked threads are skipped, so a profile taken while
+    one request runs is dominated by the threads doing its work.
+    """
+
+    def __init__(self, interval=0.005) -> None:
+        self.interval = interval
+        self.stacks = Counter()
+        self.n_samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        own_id = threading.get_ident()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id or os.path.basename(frame.f_code.co_filename) in IDLE_FILES:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append("{} ({}:{})".format(code.co_name, os.path.basename(code.co_filename), code.co_firstlineno))
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+        self.n_samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self
+
+    def collapsed(self):
+        return "\n".join("{} {}".format(stack, count) for stack, count in self.stacks.most_common()) + "\n"
+
+    def dump(self, directory, name):
+        """
+        Write the collapsed stacks to ``directory/<timestamp>-<name>.folded`` and return the path.
+        """
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, "{}-{}.folded".format(time.strftime("%Y%m%d-%H%M%S"), name))
+        with open(path, "w") as f:
+            f.write(self.collapsed())
+        return path
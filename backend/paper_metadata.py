@@ -0,0 +1,232 @@
+import os
+import shutil
+
+import numpy as np
+
+TEXT_COLUMNS = ("title", "author", "description", "subject")
+
+
+class TextColumn:
+    """
+    Strings stored as one UTF-8 byte buffer plus ``n + 1`` offsets, indexed by paper id.
+
+    Row ``i`` is ``data[offsets[i]:offsets[i + 1]]``; ``nulls`` marks rows that are NULL
+    in the database (or have no row at all), as opposed to empty strings.
+    """
+
+    def __init__(self, offsets, data, nulls) -> None:
+        self.offsets = offsets
+        self.data = data
+        self.nulls = nulls
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        mmap_mode = "r" if mmap else None
+        offsets = np.load(path + ".offsets.npy", mmap_mode=mmap_mode)
+        # An empty buffer cannot be memory-mapped
+        data = np.load(path + ".data.npy", mmap_mode=mmap_mode if offsets[-1] else None)
+        return cls(offsets, data, np.load(path + ".nulls.npy"))
+
+    def get(self, ids):
+        """
+        Return the strings of ``ids`` as a list, with None for NULL rows.
+        """
+        starts, ends = self.offsets[ids].tolist(), self.offsets[np.asarray(ids) + 1].tolist()
+        nulls = self.nulls[ids].tolist()
+        return [None if null else self.data[start:end].tobytes().decode("utf-8") for start, end, null in zip(starts, ends, nulls)]
+
+
+class PaperMetadata:
+    """
+    Columnar, read-only copy of the ``Papers`` table, indexed by paper id (= FAISS id).
+
+    ``years`` (float32, NaN when missing) and ``counts`` (int64, -1 when missing) are
+    plain arrays; text columns are offset-indexed byte buffers that are memory-mapped
+    from disk, so listing, filtering, sorting and labelling papers the API already holds
+    as ids never goes back to SQLite. ``by_counts`` lists the existing ids in the
+    ``/data`` order (counts, then id, both descending).
+
+    SQLite remains the source of truth: ``loadOrBuild`` rebuilds the files whenever the
+    database is newer than them.
+    """
+
+    def __init__(self, present, years, counts, by_counts, text) -> None:
+        self.present = present
+        self.years = years
+        self.counts = counts
+        self.by_counts = by_counts
+        self.text = text
+        # Ascending keys for binary search over the (counts DESC, id DESC) order
+        self._negative_counts = -counts[by_counts]
+        self._negative_ids = -by_counts
+
+    def __len__(self):
+        return len(self.present)
+
+    @classmethod
+    def build(cls, directory, session, papers_model, n_total=0, batch_size=10000):
+        """
+        Stream the papers table into the on-disk layout under ``directory``.
+
+        Files are written to a sibling temp directory and moved into place with
+        ``os.replace`` once complete, ``present.npy`` last, so an interrupted or
+        concurrent build never leaves a truncated file behind a fresh marker.
+
+        Args:
+            directory (str): Output directory.
+            session (Session): Database session.
+            papers_model: The ``Papers`` ORM model.
+            n_total (int, optional): Minimum number of rows, e.g. the size of the FAISS index,
+                so the arrays cover every id the index can return. Defaults to 0.
+            batch_size (int, optional): Rows fetched per round trip. Defaults to 10000.
+        """
+        os.makedirs(directory, exist_ok=True)
+        build_directory = "{}.tmp-{}".format(os.path.normpath(directory), os.getpid())
+        shutil.rmtree(build_directory, ignore_errors=True)
+        os.makedirs(build_directory)
+        max_id = session.query(papers_model.id).order_by(papers_model.id.desc()).limit(1).scalar()
+        n_total = max(n_total, max_id + 1 if max_id is not None else 0)
+        present = np.zeros(n_total, dtype=bool)
+        years = np.full(n_total, np.nan, dtype=np.float32)
+        counts = np.full(n_total, -1, dtype=np.int64)
+        lengths = {column: np.zeros(n_total, dtype=np.int64) for column in TEXT_COLUMNS}
+        nulls = {column: np.ones(n_total, dtype=bool) for column in TEXT_COLUMNS}
+        buffers = {column: open(os.path.join(build_directory, column + ".bin"), "wb") for column in TEXT_COLUMNS}
+
+        # Rows arrive in id order, so each buffer is written sequentially
+        columns = [papers_model.id, papers_model.publication_year, papers_model.counts] + [getattr(papers_model, column) for column in TEXT_COLUMNS]
+        try:
+            for row in session.query(*columns).order_by(papers_model.id).yield_per(batch_size):
+                paper_id = row[0]
+                present[paper_id] = True
+                if row[1] is not None:
+                    years[paper_id] = row[1]
+                if row[2] is not None:
+                    counts[paper_id] = row[2]
+                for column, value in zip(TEXT_COLUMNS, row[3:]):
+                    if value is not None:
+                        encoded = value.encode("utf-8")
+                        buffers[column].write(encoded)
+                        lengths[column][paper_id] = len(encoded)
+                        nulls[column][paper_id] = False
+        finally:
+            for buffer in buffers.values():
+                buffer.close()
+
+        for column in TEXT_COLUMNS:
+            offsets = np.zeros(n_total + 1, dtype=np.int64)
+            np.cumsum(lengths[column], out=offsets[1:])
+            raw_path = os.path.join(build_directory, column + ".bin")
+            data_path = os.path.join(build_directory, column + ".data.npy")
+            if offsets[-1]:
+                # Copy through a memmap so the buffer is never held in memory whole
+                data = np.lib.format.open_memmap(data_path, mode="w+", dtype=np.uint8, shape=(int(offsets[-1]),))
+                with open(raw_path, "rb") as f:
+                    f.readinto(data)
+                data.flush()
+                del data
+            else:
+                np.save(data_path, np.empty(0, dtype=np.uint8))
+            os.remove(raw_path)
+            np.save(os.path.join(build_directory, column + ".offsets.npy"), offsets)
+            np.save(os.path.join(build_directory, column + ".nulls.npy"), nulls[column])
+        ids = np.flatnonzero(present)
+        by_counts = ids[np.lexsort((-ids, -counts[ids]))]
+        np.save(os.path.join(build_directory, "years.npy"), years)
+        np.save(os.path.join(build_directory, "counts.npy"), counts)
+        np.save(os.path.join(build_directory, "by_counts.npy"), by_counts)
+        np.save(os.path.join(build_directory, "present.npy"), present)
+
+        # Invalidate the old build first, so a reader never pairs its marker with new files
+        marker = os.path.join(directory, "present.npy")
+        if os.path.exists(marker):
+            os.remove(marker)
+        # present.npy goes last: its presence and mtime mark a complete build
+        for name in sorted(os.listdir(build_directory), key=lambda name: name == "present.npy"):
+            os.replace(os.path.join(build_directory, name), os.path.join(directory, name))
+        os.rmdir(build_directory)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        path = lambda name: os.path.join(directory, name)
+        text = {column: TextColumn.load(path(column), mmap=mmap) for column in TEXT_COLUMNS}
+        return cls(np.load(path("present.npy")), np.load(path("years.npy")), np.load(path("counts.npy")), np.load(path("by_counts.npy")), text)
+
+    @classmethod
+    def loadOrBuild(cls, directory, session, papers_model, n_total=0, source_path=None, mmap=True):
+        """
+        Load the store under ``directory``, rebuilding it from the database when it is
+        missing, older than ``source_path`` or smaller than ``n_total``.
+        """
+        marker = os.path.join(directory, "present.npy")
+        if not os.path.exists(marker) or (source_path is not None and os.path.getmtime(marker) < os.path.getmtime(source_path)):
+            cls.build(directory, session, papers_model, n_total)
+        paper_metadata = cls.load(directory, mmap=mmap)
+        if len(paper_metadata) < n_total:
+            cls.build(directory, session, papers_model, n_total)
+            paper_metadata = cls.load(directory, mmap=mmap)
+        return paper_metadata
+
+    def _cursorPosition(self, after_counts, after_id):
+        # First position in by_counts after the (counts, id) cursor
+        start = int(np.searchsorted(self._negative_counts, -after_counts, side="left"))
+        end = int(np.searchsorted(self._negative_counts, -after_counts, side="right"))
+        return start + int(np.searchsorted(self._negative_ids[start:end], -after_id, side="right"))
+
+    def topPage(self, start_year, end_year, skip=0, limit=20, after=None, block_size=65536):
+        """
+        Return the ids of one page of papers published in the year range, most cited first.
+
+        The pre-sorted ``by_counts`` order is scanned in blocks and stops as soon as the
+        page is filled, so early pages touch only a small prefix of the corpus.
+
+        Args:
+            start_year (int): First year to include.
+            end_year (int): Last year to include.
+            skip (int, optional): Matching papers to skip; ignored with ``after``. Defaults to 0.
+            limit (int, optional): Page size. Defaults to 20.
+            after (tuple, optional): ``(counts, id)`` keyset cursor of the previous page's last paper. Defaults to None.
+            block_size (int, optional): Ids filtered per step. Defaults to 65536.
+
+        Returns:
+            numpy.ndarray: int64 ids of the page, in order.
+        """
+        position = self._cursorPosition(*after) if after is not None else 0
+        n_needed = limit + (skip if after is None else 0)
+        found, n_found = [], 0
+        while position < len(self.by_counts) and n_found < n_needed:
+            block = self.by_counts[position:position + block_size]
+            block_years = self.years[block]
+            found.append(block[(block_years >= start_year) & (block_years <= end_year)])
+            n_found += len(found[-1])
+            position += block_size
+        ids = np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+        return ids[n_needed - limit:n_needed]
+
+    def rows(self, ids, fields):
+        """
+        Return the papers of ``ids`` as dicts of ``fields``, in the order given.
+
+        Ids with no row in the database are dropped, as an ``IN`` query would.
+
+        Args:
+            ids (array-like): Paper ids.
+            fields (list): Names from ``serialization.PAPER_FIELDS``.
+
+        Returns:
+            list: One dict per existing paper.
+        """
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        ids = ids[(ids >= 0) & (ids < len(self.present))]
+        ids = ids[self.present[ids]]
+        values = []
+        for field in fields:
+            if field == "id":
+                values.append(ids.tolist())
+            elif field == "publication_year":
+                values.append([None if np.isnan(year) else int(year) for year in self.years[ids].tolist()])
+            elif field == "counts":
+                values.append([None if count < 0 else count for count in self.counts[ids].tolist()])
+            else:
+                values.append(self.text[field].get(ids))
+        return [dict(zip(fields, row)) for row in zip(*values)]
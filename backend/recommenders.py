@@ -0,0 +1,229 @@
+import copy
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import SGDClassifier
+
+from metrics import metrics
+from suggestions import SuggestionSession
+
+
+def reportProgress(on_progress, fraction):
+    # Between stages, so a cancelled job's update raises before the next one starts
+    if on_progress is not None:
+        on_progress(fraction)
+
+
+class ForestRecommender:
+    """
+    Slow, accurate mode: fits a random forest on the liked papers against sampled
+    negatives and scores the whole corpus with ``predict_proba``.
+    """
+
+    def __init__(self, store, sampler, n_estimators=100, n_not_liked=1000) -> None:
+        self.store = store
+        self.sampler = sampler
+        self.n_estimators = n_estimators
+        self.n_not_liked = n_not_liked
+
+    def recommend(self, liked_ids, k=1000, seed=None, previous=None, on_progress=None):
+        """
+        Score every paper against the liked set.
+
+        Args:
+            liked_ids (list): FAISS ids of the liked papers.
+            k (int, optional): Size of the pre-sorted top-k index kept in the session. Defaults to 1000.
+            seed (int, optional): Seed for negative sampling. Defaults to None.
+            previous (SuggestionSession, optional): Unused, accepted for a uniform recommender interface. Defaults to None.
+            on_progress (callable, optional): Called with the fraction done between stages, e.g. a
+                job's ``update``, which raises ``JobCancelled`` once the job is cancelled. Defaults to None.
+
+        Returns:
+            SuggestionSession: Session holding a score for every paper.
+        """
+        with metrics.span("train.embeddings"):
+            liked_embeddings = self.store.get(liked_ids)
+        with metrics.span("train.negative_sampling"):
+            _, not_liked_embeddings = self.sampler.sample(liked_ids, self.n_not_liked, seed=seed)
+        reportProgress(on_progress, 0.2)
+        X = np.vstack([liked_embeddings, not_liked_embeddings])
+        y = [1] * len(liked_embeddings) + [0] * len(not_liked_embeddings)
+        classifier = RandomForestClassifier(n_estimators=self.n_estimators, random_state=42)
+        with metrics.span("train.fit"):
+            classifier.fit(X, y)
+        reportProgress(on_progress, 0.6)
+        with metrics.span("train.predict"):
+            scores = classifier.predict_proba(self.store.all())[:, 1]
+        reportProgress(on_progress, 0.8)
+        with metrics.span("train.rank"):
+            return SuggestionSession(scores, top_k=k)
+
+
+class CentroidRecommender:
+    """
+    Fast mode: searches the FAISS index with a Rocchio-style query built from the
+    mean of the liked embeddings, minus a weighted mean of sampled negatives.
+    """
+
+    def __init__(self, index, store, sampler, negative_weight=0.25, n_not_liked=100) -> None:
+        self.index = index
+        self.store = store
+        self.sampler = sampler
+        self.negative_weight = negative_weight
+        self.n_not_liked = n_not_liked
+
+    def query(self, liked_ids, seed=None):
+        query = self.store.get(liked_ids).mean(axis=0)
+        if self.negative_weight:
+            _, not_liked_embeddings = self.sampler.sample(liked_ids, self.n_not_liked, seed=seed)
+            if len(not_liked_embeddings):
+                query = query - self.negative_weight * not_liked_embeddings.mean(axis=0)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+        return np.ascontiguousarray(query[None, :], dtype=np.float32)
+
+    def recommend(self, liked_ids, k=1000, seed=None, previous=None, on_progress=None):
+        """
+        Return the ``k`` papers closest to the liked centroid.
+
+        Args:
+            liked_ids (list): FAISS ids of the liked papers.
+            k (int, optional): Number of suggestions. Defaults to 1000.
+            seed (int, optional): Seed for negative sampling. Defaults to None.
+            previous (SuggestionSession, optional): Unused, accepted for a uniform recommender interface. Defaults to None.
+            on_progress (callable, optional): Called with the fraction done between stages, e.g. a
+                job's ``update``, which raises ``JobCancelled`` once the job is cancelled. Defaults to None.
+
+        Returns:
+            SuggestionSession: Session holding the top-k results.
+        """
+        with metrics.span("train.query"):
+            query = self.query(liked_ids, seed=seed)
+        reportProgress(on_progress, 0.5)
+        with metrics.span("train.search"):
+            distances, indices = self.index.search(query, k)
+        found = indices[0] >= 0
+        return SuggestionSession.fromTopK(indices[0][found], distances[0][found], len(self.store))
+
+
+class KnnRecommender:
+    """
+    Fast mode: searches the FAISS index once per liked paper in a single batched call
+    and ranks the union of the neighbours by their best similarity to any liked paper.
+    """
+
+    def __init__(self, index, store, min_neighbours=10) -> None:
+        self.index = index
+        self.store = store
+        self.min_neighbours = min_neighbours
+
+    def recommend(self, liked_ids, k=1000, seed=None, previous=None, on_progress=None):
+        """
+        Return up to ``k`` papers from the union of the per-like nearest neighbours.
+
+        Args:
+            liked_ids (list): FAISS ids of the liked papers.
+            k (int, optional): Number of suggestions. Defaults to 1000.
+            seed (int, optional): Unused, accepted for a uniform recommender interface. Defaults to None.
+            previous (SuggestionSession, optional): Unused, accepted for a uniform recommender interface. Defaults to None.
+            on_progress (callable, optional): Called with the fraction done between stages, e.g. a
+                job's ``update``, which raises ``JobCancelled`` once the job is cancelled. Defaults to None.
+
+        Returns:
+            SuggestionSession: Session holding the top-k results.
+        """
+        with metrics.span("train.embeddings"):
+            queries = np.ascontiguousarray(self.store.get(liked_ids), dtype=np.float32)
+        reportProgress(on_progress, 0.2)
+        k_each = max(self.min_neighbours, -(-k // max(len(liked_ids), 1)))
+        with metrics.span("train.search"):
+            distances, indices = self.index.search(queries, k_each)
+        indices, distances = indices.ravel(), distances.ravel()
+        found = indices >= 0
+        indices, distances = indices[found], distances[found]
+        order = np.argsort(-distances, kind="stable")
+        indices, distances = indices[order], distances[order]
+        _, first = np.unique(indices, return_index=True)
+        first = np.sort(first)[:k]
+        return SuggestionSession.fromTopK(indices[first], distances[first], len(self.store))
+
+
+class IncrementalRecommender:
+    """
+    Fast, updatable mode: a logistic model trained with ``partial_fit``.
+
+    The first request of a session fits the model for ``n_epochs`` passes over the liked
+    papers and sampled negatives. When the user then likes more papers, the previous
+    session's model is copied and updated with only the new positives and a matching
+    share of fresh negatives, instead of being refitted from scratch. Scoring the corpus
+    is a single matrix-vector product. Removing a like needs a full refit, since the
+    model cannot unlearn a positive.
+
+    Papers are scored by the model's logit (``decision_function``) rather than its
+    probability: the class-weighted model saturates, and many probabilities round to
+    exactly 1.0 in float32, which would leave the ranking to id order.
+    """
+
+    def __init__(self, store, sampler, n_not_liked=1000, n_epochs=5, alpha=1e-4) -> None:
+        self.store = store
+        self.sampler = sampler
+        self.n_not_liked = n_not_liked
+        self.n_epochs = n_epochs
+        self.alpha = alpha
+
+    def _partialFit(self, model, positive_ids, all_liked_ids, n_negative, rng, on_progress=None):
+        with metrics.span("train.embeddings"):
+            positives = self.store.get(positive_ids)
+        with metrics.span("train.negative_sampling"):
+            _, negatives = self.sampler.sample(all_liked_ids, n_negative, seed=int(rng.integers(2**31)))
+        reportProgress(on_progress, 0.2)
+        X = np.vstack([positives, negatives])
+        y = np.array([1] * len(positives) + [0] * len(negatives))
+        # Balance the classes, which partial_fit cannot do through class_weight
+        weights = np.where(y == 1, len(negatives) / max(len(positives), 1), 1.0)
+        with metrics.span("train.fit"):
+            for epoch in range(self.n_epochs):
+                order = rng.permutation(len(y))
+                model.partial_fit(X[order], y[order], classes=[0, 1], sample_weight=weights[order])
+                reportProgress(on_progress, 0.2 + 0.4 * (epoch + 1) / self.n_epochs)
+        return model
+
+    def recommend(self, liked_ids, k=1000, seed=None, previous=None, on_progress=None):
+        """
+        Score every paper against the liked set, updating ``previous``'s model when it can.
+
+        Args:
+            liked_ids (list): FAISS ids of the liked papers.
+            k (int, optional): Size of the pre-sorted top-k index kept in the session. Defaults to 1000.
+            seed (int, optional): Seed for negative sampling and shuffling. Defaults to None.
+            previous (SuggestionSession, optional): The session's last result; its model is
+                updated if it was trained on a subset of ``liked_ids``. Defaults to None.
+            on_progress (callable, optional): Called with the fraction done between stages, e.g. a
+                job's ``update``, which raises ``JobCancelled`` once the job is cancelled. Defaults to None.
+
+        Returns:
+            SuggestionSession: Session holding a score for every paper and the updated model.
+        """
+        rng = np.random.default_rng(seed)
+        liked = list(dict.fromkeys(int(i) for i in liked_ids))
+        known = set(previous.liked_ids) if previous is not None and isinstance(previous.model, SGDClassifier) else None
+        if known is not None and known.issubset(liked):
+            new_ids = [i for i in liked if i not in known]
+            if not new_ids:
+                return previous
+            # The model may be shared through the result cache, so update a copy
+            model = copy.deepcopy(previous.model)
+            n_negative = max(1, self.n_not_liked * len(new_ids) // len(liked))
+            self._partialFit(model, new_ids, liked, n_negative, rng, on_progress)
+        else:
+            model = SGDClassifier(loss="log_loss", alpha=self.alpha, random_state=seed if seed is not None else 42)
+            self._partialFit(model, liked, liked, self.n_not_liked, rng, on_progress)
+        with metrics.span("train.predict"):
+            scores = model.decision_function(self.store.all())
+        reportProgress(on_progress, 0.8)
+        with metrics.span("train.rank"):
+            suggestion_session = SuggestionSession(scores, top_k=k)
+        suggestion_session.model = model
+        suggestion_session.liked_ids = liked
+        return suggestion_session
@@ -0,0 +1,65 @@
+import numpy as np
+
+
+class NegativeSampler:
+    """
+    Draws random negative examples from an EmbeddingStore while excluding a positive set.
+
+    Candidates are drawn as random row ids and rejected against the sorted positive ids,
+    so the cost depends on the sample size rather than on the corpus size. Only the
+    sampled rows are materialized.
+    """
+
+    def __init__(self, store, seed=None) -> None:
+        self.store = store
+        self.seed = seed
+
+    def sampleIds(self, positive_ids, k, seed=None):
+        """
+        Sample up to ``k`` distinct row ids that are not in ``positive_ids``.
+
+        Args:
+            positive_ids (list): Row ids to exclude.
+            k (int): Number of ids to draw.
+            seed (int, optional): Seed for this call, overriding the sampler seed. Defaults to None.
+
+        Returns:
+            numpy.ndarray: int64 array of sampled row ids, in random order.
+        """
+        rng = np.random.default_rng(self.seed if seed is None else seed)
+        n_total = len(self.store)
+        positives = np.unique(np.asarray(positive_ids, dtype=np.int64))
+        n_available = n_total - positives.size
+        k = min(k, n_available)
+        if k <= 0:
+            return np.empty(0, dtype=np.int64)
+
+        # Rejection sampling stops paying off once most of the corpus is requested.
+        if 2 * (k + positives.size) > n_total:
+            candidates = np.setdiff1d(np.arange(n_total, dtype=np.int64), positives, assume_unique=True)
+            return rng.choice(candidates, size=k, replace=False)
+
+        sampled = np.empty(0, dtype=np.int64)
+        while sampled.size < k:
+            missing = k - sampled.size
+            candidates = rng.integers(0, n_total, size=missing + missing // 4 + 8, dtype=np.int64)
+            candidates = candidates[~np.isin(candidates, positives, assume_unique=False)]
+            candidates = np.concatenate([sampled, candidates])
+            _, first = np.unique(candidates, return_index=True)
+            sampled = candidates[np.sort(first)]
+        return sampled[:k]
+
+    def sample(self, positive_ids, k, seed=None):
+        """
+        Sample negatives and return both their ids and their embedding rows.
+
+        Args:
+            positive_ids (list): Row ids to exclude.
+            k (int): Number of negatives to draw.
+            seed (int, optional): Seed for this call. Defaults to None.
+
+        Returns:
+            tuple: ``(ids, rows)`` where ``rows`` has shape ``(len(ids), dim)``.
+        """
+        ids = self.sampleIds(positive_ids, k, seed=seed)
+        return ids, self.store.get(ids)
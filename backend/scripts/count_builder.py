@@ -0,0 +1,181 @@
+import argparse
+import json
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+
+from subject_index import normalizeSubject
+
+
+class SubjectCountBuilder:
+    """
+    Builds per-subject yearly paper counts in one streaming pass.
+
+    Each chunk of records is exploded into ``(year, subject)`` pairs and histogrammed
+    with ``np.bincount``; the histogram grows as new years and subjects appear, so an
+    existing artifact can be loaded and merged with newly ingested records. The
+    cumulative counts served by ``/count`` are a ``cumsum`` over the year axis.
+    """
+
+    def __init__(self, subjects=None, first_year=None, histogram=None) -> None:
+        self.subjects = list(subjects) if subjects is not None else []
+        self.subject_ids = {subject: i for i, subject in enumerate(self.subjects)}
+        if histogram is None:
+            histogram = np.zeros((0, len(self.subjects)), dtype=np.int32)
+        self.histogram = np.asarray(histogram, dtype=np.int32)
+        self.first_year = first_year if self.histogram.shape[0] else None
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load an artifact written by ``save`` so new records can be merged into it.
+        """
+        data = np.load(path, allow_pickle=False)
+        return cls(data["subjects"].tolist(), int(data["first_year"]), data["histogram"])
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                subjects=np.asarray(self.subjects, dtype=str),
+                first_year=np.int64(self.first_year if self.first_year is not None else 0),
+                histogram=self.histogram,
+            )
+
+    def _grow(self, first_year, last_year):
+        if self.first_year is None:
+            self.first_year = first_year
+        pad_before = max(0, self.first_year - first_year)
+        pad_after = max(0, last_year - (self.first_year + self.histogram.shape[0] - 1))
+        pad_columns = len(self.subjects) - self.histogram.shape[1]
+        if pad_before or pad_after or pad_columns:
+            self.histogram = np.pad(self.histogram, ((pad_before, pad_after), (0, pad_columns)))
+            self.first_year -= pad_before
+
+    def addRecords(self, years, subjects, weight=1):
+        """
+        Add one chunk of records.
+
+        Args:
+            years (array-like): Publication year of each record.
+            subjects (array-like): Comma-separated subject string of each record.
+            weight (int, optional): Amount each record adds; -1 retracts records being replaced. Defaults to 1.
+        """
+        frame = pd.DataFrame({"year": pd.to_numeric(pd.Series(years), errors="coerce"), "subject": pd.Series(subjects)})
+        frame = frame.dropna()
+        if frame.empty:
+            return
+        frame["subject"] = frame["subject"].astype(str).str.split(",")
+        pairs = frame.explode("subject")
+        pairs["subject"] = pairs["subject"].map(normalizeSubject)
+        pairs = pairs[pairs["subject"] != ""]
+        if pairs.empty:
+            return
+
+        for subject in pairs["subject"].unique():
+            if subject not in self.subject_ids:
+                self.subject_ids[subject] = len(self.subjects)
+                self.subjects.append(subject)
+        year_values = pairs["year"].to_numpy(dtype=np.int64)
+        self._grow(int(year_values.min()), int(year_values.max()))
+
+        rows = year_values - self.first_year
+        columns = pairs["subject"].map(self.subject_ids).to_numpy(dtype=np.int64)
+        n_columns = self.histogram.shape[1]
+        flat = np.bincount(rows * n_columns + columns, minlength=self.histogram.size)
+        self.histogram += weight * flat.reshape(self.histogram.shape).astype(np.int32)
+
+    def addFrames(self, frames, year_column, subject_column):
+        n_records = 0
+        for frame in frames:
+            self.addRecords(frame[year_column], frame[subject_column])
+            n_records += len(frame)
+        return n_records
+
+    def merge(self, other):
+        """
+        Add the counts of another builder into this one.
+        """
+        for subject in other.subjects:
+            if subject not in self.subject_ids:
+                self.subject_ids[subject] = len(self.subjects)
+                self.subjects.append(subject)
+        if other.first_year is None or not other.histogram.size:
+            return
+        self._grow(other.first_year, other.first_year + other.histogram.shape[0] - 1)
+        start = other.first_year - self.first_year
+        columns = [self.subject_ids[subject] for subject in other.subjects]
+        self.histogram[start:start + other.histogram.shape[0], columns] += other.histogram
+
+    def cumulative(self):
+        """
+        Return ``(years, cumulative)`` where ``cumulative[i, s]`` counts papers of subject ``s`` published before ``years[i]``.
+        """
+        cumulative = np.zeros((self.histogram.shape[0] + 1, self.histogram.shape[1]), dtype=np.int32)
+        np.cumsum(self.histogram, axis=0, out=cumulative[1:])
+        years = np.arange(self.histogram.shape[0] + 1) + (self.first_year or 0)
+        return years, cumulative
+
+    def toJson(self, path):
+        """
+        Write the legacy ``eric_counts.json`` layout: ``{subject: {year: papers before year}}``,
+        listing each subject from the year after its first paper.
+        """
+        years, cumulative = self.cumulative()
+        counts = {}
+        for column, subject in enumerate(self.subjects):
+            first_row = int(np.argmax(self.histogram[:, column] > 0)) + 1
+            counts[subject] = dict(zip(years[first_row:].tolist(), cumulative[first_row:, column].tolist()))
+        with open(path, "w") as f:
+            json.dump(counts, f)
+
+
+def readCsv(path, year_column, subject_column, chunksize):
+    return pd.read_csv(path, usecols=[year_column, subject_column], chunksize=chunksize)
+
+
+def readSqlite(path, table, year_column, subject_column, chunksize):
+    connection = sqlite3.connect(path)
+    try:
+        query = 'SELECT "{}", "{}" FROM "{}"'.format(year_column, subject_column, table)
+        yield from pd.read_sql_query(query, connection, chunksize=chunksize)
+    finally:
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build per-subject yearly cumulative paper counts.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--csv", help="CSV export of ERIC records, e.g. database/eric_records.csv")
+    source.add_argument("--sqlite", help="SQLite database, e.g. database/eric_database.db")
+    parser.add_argument("--table", default="papers", help="Table to read when using --sqlite")
+    parser.add_argument("--year-column", help="Defaults to publicationdateyear for CSV and publication_year for SQLite")
+    parser.add_argument("--subject-column", default="subject")
+    parser.add_argument("--chunksize", type=int, default=50000)
+    parser.add_argument("--merge", help="Existing counts artifact to add the new records to")
+    parser.add_argument("--output", default="database/eric_counts.npz")
+    parser.add_argument("--json", help="Also write the legacy eric_counts.json layout to this path")
+    args = parser.parse_args()
+
+    startTime = time.time()
+    builder = SubjectCountBuilder.load(args.merge) if args.merge else SubjectCountBuilder()
+    if args.csv:
+        year_column = args.year_column or "publicationdateyear"
+        frames = readCsv(args.csv, year_column, args.subject_column, args.chunksize)
+    else:
+        year_column = args.year_column or "publication_year"
+        frames = readSqlite(args.sqlite, args.table, year_column, args.subject_column, args.chunksize)
+    n_records = builder.addFrames(frames, year_column, args.subject_column)
+    builder.save(args.output)
+    if args.json:
+        builder.toJson(args.json)
+    print(
+        "Counted", "{:,}".format(n_records), "records over", "{:,}".format(len(builder.subjects)),
+        "subjects in", "{:,.1f}".format(time.time() - startTime), "seconds",
+    )
+
+
+if __name__ == "__main__":
+    main()
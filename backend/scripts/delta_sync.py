@@ -0,0 +1,245 @@
+import argparse
+import os
+import time
+
+import faiss
+import joblib
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from atomic_io import writeAtomically
+from scripts.count_builder import SubjectCountBuilder
+from scripts.eric_api import EricApi
+from scripts.eric_harvester import EricHarvester, pooledSession
+from scripts.faiss_controller import embedDescriptions
+
+SYNC_FIELDS = ["id", "title", "author", "description", "subject", "publicationdateyear", "e_datemodified"]
+
+
+def toIdMap(index):
+    """
+    Wrap a sequentially numbered index in an ``IndexIDMap2`` whose ids are its row numbers,
+    so vectors can later be replaced and added under explicit ``Papers.id`` values.
+    """
+    if hasattr(index, "id_map"):
+        return index
+    id_map = faiss.IndexIDMap2(faiss.IndexFlatIP(index.d))
+    if index.ntotal:
+        id_map.add_with_ids(index.reconstruct_n(0, index.ntotal), np.arange(index.ntotal, dtype=np.int64))
+    return id_map
+
+
+def checkRemovable(index):
+    """
+    Raise a ValueError if the vectors of ``index`` cannot be replaced in place.
+
+    Changed records are re-embedded with ``remove_ids`` followed by ``add_with_ids``, which
+    HNSW graphs do not support; such an index must be rebuilt with ``faiss_controller``.
+    """
+    inner = faiss.downcast_index(index.index) if hasattr(index, "id_map") else index
+    if isinstance(inner, faiss.IndexHNSW):
+        raise ValueError(
+            "Delta sync cannot update an HNSW index ({}): it does not support remove_ids. "
+            "Rebuild the index with scripts/faiss_controller.py, or build it with --kind flat, ivf or ivfpq.".format(type(inner).__name__)
+        )
+    return index
+
+
+def orNone(value):
+    return None if pd.isna(value) else value
+
+
+class DeltaSync:
+    """
+    Incremental sync of new and changed ERIC records into the ``Papers`` table and the FAISS index.
+
+    Only records whose ``e_datemodified`` is after the last sync are harvested. Each one is
+    matched to an existing paper through the ``eric_sync`` bookkeeping table (with
+    ``match_existing``, falling back to title and publication year for papers loaded
+    before the first sync), upserted into ``Papers``, and its vector is replaced or added
+    in an ``IndexIDMap2`` under the same id, so FAISS ids stay aligned with ``Papers.id``.
+    The counts artifact is patched by retracting the old version of each changed record
+    and adding the new one.
+
+    The whole sync runs in one database transaction that is committed only after the
+    index and counts have been persisted, so a failed run leaves the ``eric_sync``
+    watermark where it was and the next run harvests the same records again.
+    """
+
+    def __init__(self, engine, papers_model, index, vectorizer, harvester=None, count_builder=None, match_existing=False) -> None:
+        self.engine = engine
+        self.Session = sessionmaker(bind=engine)
+        self.papers_model = papers_model
+        self.index = checkRemovable(toIdMap(index))
+        self.vectorizer = vectorizer
+        self.harvester = harvester if harvester is not None else EricHarvester()
+        self.count_builder = count_builder
+        self.match_existing = match_existing
+        self.next_id = None
+        with self.engine.begin() as connection:
+            connection.execute(text(
+                "CREATE TABLE IF NOT EXISTS eric_sync ("
+                "eric_id TEXT PRIMARY KEY, paper_id INTEGER NOT NULL, e_datemodified TEXT)"
+            ))
+
+    def lastModified(self):
+        with self.engine.connect() as connection:
+            return connection.execute(text("SELECT MAX(e_datemodified) FROM eric_sync")).scalar()
+
+    def _paperIds(self, session, page):
+        Papers = self.papers_model
+        # Read through the session so records of earlier, uncommitted pages are seen
+        rows = session.execute(
+            text("SELECT eric_id, paper_id FROM eric_sync WHERE eric_id IN ({})".format(
+                ", ".join(":id{}".format(i) for i in range(len(page)))
+            )),
+            {"id{}".format(i): eric_id for i, eric_id in enumerate(page["id"])},
+        ).all()
+        known = dict(rows)
+        if self.next_id is None:
+            last_paper_id = session.query(Papers.id).order_by(Papers.id.desc()).limit(1).scalar()
+            last_index_id = int(faiss.vector_to_array(self.index.id_map).max()) if self.index.ntotal else -1
+            self.next_id = max(-1 if last_paper_id is None else last_paper_id, last_index_id) + 1
+        paper_ids = []
+        for record in page.itertuples(index=False):
+            paper_id = known.get(record.id)
+            if paper_id is None and self.match_existing:
+                match = session.query(Papers.id).filter(
+                    Papers.title == record.title, Papers.publication_year == int(record.publicationdateyear)
+                ).first()
+                paper_id = None if match is None else match.id
+            if paper_id is None:
+                paper_id = self.next_id
+                self.next_id += 1
+            paper_ids.append(paper_id)
+        return paper_ids
+
+    def syncPage(self, session, page):
+        """
+        Upsert one harvested page into the database session, the index and the counts.
+
+        Nothing is committed here; ``sync`` commits once every page is in.
+
+        Args:
+            session (Session): Session holding the sync's transaction.
+            page (pandas.DataFrame): Cleaned records with the ``SYNC_FIELDS`` columns.
+
+        Returns:
+            int: Number of records synced.
+        """
+        page = page.dropna(subset=["id", "description", "subject", "publicationdateyear"])
+        if page.empty:
+            return 0
+        Papers = self.papers_model
+        paper_ids = self._paperIds(session, page)
+        existing = {
+            paper.id: paper
+            for paper in session.query(Papers).filter(Papers.id.in_(paper_ids)).all()
+        }
+        if self.count_builder is not None and existing:
+            old = list(existing.values())
+            self.count_builder.addRecords([p.publication_year for p in old], [p.subject for p in old], weight=-1)
+        for paper_id, record in zip(paper_ids, page.itertuples(index=False)):
+            paper = existing.get(paper_id)
+            if paper is None:
+                paper = Papers(id=paper_id, counts=0)
+                session.add(paper)
+            paper.title = orNone(record.title)
+            paper.author = orNone(record.author)
+            paper.description = record.description
+            paper.subject = record.subject
+            paper.publication_year = int(record.publicationdateyear)
+        session.flush()
+        session.execute(
+            text(
+                "INSERT OR REPLACE INTO eric_sync (eric_id, paper_id, e_datemodified) "
+                "VALUES (:eric_id, :paper_id, :e_datemodified)"
+            ),
+            [
+                {"eric_id": record.id, "paper_id": paper_id, "e_datemodified": record.e_datemodified}
+                for paper_id, record in zip(paper_ids, page.itertuples(index=False))
+            ],
+        )
+        # Release the page's ORM objects; the rows stay in the open transaction
+        session.expunge_all()
+
+        ids = np.asarray(paper_ids, dtype=np.int64)
+        self.index.remove_ids(ids)
+        self.index.add_with_ids(embedDescriptions(self.vectorizer, page["description"].tolist()), ids)
+        if self.count_builder is not None:
+            self.count_builder.addRecords(page["publicationdateyear"], page["subject"])
+        return len(page)
+
+    def sync(self, search="*", since=None, persist=None):
+        """
+        Harvest and upsert every record of ``search`` modified after ``since``.
+
+        Args:
+            search (str, optional): Base ERIC search query. Defaults to every record.
+            since (str, optional): ISO timestamp; defaults to the latest ``e_datemodified`` already synced.
+            persist (callable, optional): Called with the number of records synced, after the
+                last page and before the database commit; writes the index and counts to disk.
+                Defaults to None.
+
+        Returns:
+            int: Number of records synced.
+        """
+        since = since or self.lastModified()
+        query = search if since is None else "({}) AND e_datemodified:[{} TO *]".format(search, since)
+        n_records = 0
+        session = self.Session()
+        try:
+            for page in self.harvester.pages(query, SYNC_FIELDS):
+                n_records += self.syncPage(session, page)
+            if persist is not None:
+                persist(n_records)
+            # Advances the eric_sync watermark only now that the index and counts are written
+            session.commit()
+        except BaseException:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+        return n_records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync new and changed ERIC records into the database and the FAISS index.")
+    parser.add_argument("--search", default="*")
+    parser.add_argument("--since", help="ISO timestamp; defaults to the last synced e_datemodified")
+    parser.add_argument("--database", default="database/eric_database.db")
+    parser.add_argument("--index", default="database/eric_index.index")
+    parser.add_argument("--vectorizer", default="database/eric_vectorizer.joblib")
+    parser.add_argument("--counts", default="database/eric_counts.npz")
+    parser.add_argument("--match-existing", action="store_true", help="Match unknown ERIC ids to existing papers by title and year (first sync)")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--base-url", default="https://api.ies.ed.gov/eric/")
+    args = parser.parse_args()
+
+    from database.db_eric import Papers
+
+    startTime = time.time()
+    count_builder = SubjectCountBuilder.load(args.counts) if os.path.exists(args.counts) else None
+    delta_sync = DeltaSync(
+        create_engine("sqlite:///" + args.database),
+        Papers,
+        faiss.read_index(args.index),
+        joblib.load(args.vectorizer),
+        harvester=EricHarvester(EricApi(args.base_url, session=pooledSession(args.workers)), max_workers=args.workers),
+        count_builder=count_builder,
+        match_existing=args.match_existing,
+    )
+    def persist(n_records):
+        if n_records:
+            writeAtomically(lambda path: faiss.write_index(delta_sync.index, path), args.index)
+            if count_builder is not None:
+                writeAtomically(count_builder.save, args.counts)
+
+    n_records = delta_sync.sync(args.search, args.since, persist=persist)
+    print("synced", "{:,}".format(n_records), "records in", "{:,.1f}".format(time.time() - startTime), "seconds")
+
+
+if __name__ == "__main__":
+    main()
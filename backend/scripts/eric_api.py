@@ -11,8 +11,14 @@ class EricApi:
     A class to interact with the ERIC (Education Resources Information Center) API.
     """
 
-    def __init__(self) -> None:
-        pass
+    def __init__(self, base_url="https://api.ies.ed.gov/eric/", session=None) -> None:
+        """
+        Args:
+            base_url (str, optional): Endpoint of the ERIC API; point it at a stub server in tests.
+            session (requests.Session, optional): Session to reuse connections through. Defaults to a new session.
+        """
+        self.base_url = base_url
+        self.session = session if session is not None else requests.Session()
 
     def getEricRecords(self, search, fields=None, start=0, rows=200):
         """
@@ -27,21 +33,29 @@ class EricApi:
         Returns:
             pandas.DataFrame: DataFrame containing the retrieved records.
         """
-        url = "https://api.ies.ed.gov/eric/?"
-        url = (
-            url
-            + "search="
-            + search
-            + "&rows="
-            + str(rows)
-            + "&format=json&start="
-            + str(start)
-        )
-        if fields:
-            url = url + "&fields=" + ", ".join(fields)
-        responseJson = requests.get(url).json()
+        responseJson = self.getEricPage(search, fields, start, rows)
         return pd.DataFrame(responseJson)
 
+    def getEricPage(self, search, fields=None, start=0, rows=200):
+        """
+        Retrieve one page of ERIC records as the raw JSON response.
+
+        Args:
+            search (str): The search query.
+            fields (list, optional): List of fields to include in the response. Defaults to None.
+            start (int, optional): The start index of the records to retrieve. Defaults to 0.
+            rows (int, optional): The number of records to retrieve per request. Defaults to 200.
+
+        Returns:
+            dict: Parsed JSON with the records under ``["response"]["docs"]``.
+        """
+        params = {"search": search, "rows": rows, "format": "json", "start": start}
+        if fields:
+            params["fields"] = ", ".join(fields)
+        response = self.session.get(self.base_url, params=params)
+        response.raise_for_status()
+        return response.json()
+
     def getRecordCount(self, search):
         """
         Get the total number of records for a given search query.
@@ -93,18 +107,12 @@ class EricApi:
             print("Search", search, "has no results")
             return []
 
+        pages = []
         while nextFirstRecord < totalRecords:
             df = self.getEricRecords(search, fields, nextFirstRecord)
-            if nextFirstRecord == 0:
-                records = pd.DataFrame(df.loc["docs"][0])
-            else:
-                records = pd.concat(
-                    [records, pd.DataFrame(df.loc["docs"][0])],
-                    sort=False,
-                    ignore_index=True,
-                )
+            page = pd.DataFrame(df.loc["docs"][0])
+            pages.append(page.applymap(self.cleanElementsUsingList) if cleanElements else page)
             nextFirstRecord += numRecordsReturnedEachApiCall
+        records = pd.concat(pages, sort=False, ignore_index=True)
         print("took", "{:,.1f}".format(time.time() - startTime), "seconds")
-        return (
-            records.applymap(self.cleanElementsUsingList) if cleanElements else records
-        )
\ No newline at end of file
+        return records
\ No newline at end of file
@@ -0,0 +1,186 @@
+import argparse
+import sqlite3
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from scripts.eric_api import EricApi
+
+
+def pooledSession(pool_size=8, retries=5, backoff_factor=0.5):
+    """
+    Create a requests.Session with a connection pool and retry/backoff on transient errors.
+
+    Args:
+        pool_size (int, optional): Maximum number of pooled connections. Defaults to 8.
+        retries (int, optional): Retries per request. Defaults to 5.
+        backoff_factor (float, optional): Exponential backoff factor between retries. Defaults to 0.5.
+
+    Returns:
+        requests.Session: The configured session.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET",),
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class SqliteSink:
+    """
+    Appends harvested pages to a SQLite table, adding columns as new fields show up.
+    """
+
+    def __init__(self, path, table="eric_records") -> None:
+        self.connection = sqlite3.connect(path)
+        self.table = table
+        self.columns = None
+
+    def write(self, frame):
+        if self.columns is None:
+            rows = self.connection.execute('PRAGMA table_info("{}")'.format(self.table)).fetchall()
+            self.columns = {row[1] for row in rows}
+        if self.columns:
+            for column in frame.columns:
+                if column not in self.columns:
+                    self.connection.execute('ALTER TABLE "{}" ADD COLUMN "{}"'.format(self.table, column))
+                    self.columns.add(column)
+        frame.to_sql(self.table, self.connection, if_exists="append", index=False)
+        if not self.columns:
+            self.columns = set(frame.columns)
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+
+class ParquetSink:
+    """
+    Streams harvested pages into one Parquet file with a fixed all-string schema over ``columns``.
+    """
+
+    def __init__(self, path, columns) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.columns = list(columns)
+        self.schema = pa.schema([(column, pa.string()) for column in self.columns])
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, frame):
+        frame = frame.reindex(columns=self.columns)
+        frame = frame.astype(object).where(frame.notna(), None).applymap(lambda value: value if value is None else str(value))
+        self.writer.write_table(self.pa.Table.from_pandas(frame, schema=self.schema, preserve_index=False))
+
+    def close(self):
+        self.writer.close()
+
+
+class EricHarvester:
+    """
+    Bulk harvester for EricApi searches.
+
+    Pages are fetched concurrently over one pooled session with bounded parallelism,
+    retries and backoff, cleaned as they arrive and handed to a sink, so the full result
+    set is never held in memory. Pages reach the sink in completion order.
+    """
+
+    def __init__(self, api=None, max_workers=8, rows=200, retries=5, backoff_factor=0.5) -> None:
+        self.api = api if api is not None else EricApi(session=pooledSession(max_workers, retries, backoff_factor))
+        self.max_workers = max_workers
+        self.rows = rows
+
+    def _fetchPage(self, search, fields, start, cleanElements):
+        docs = self.api.getEricPage(search, fields, start, self.rows)["response"]["docs"]
+        page = pd.DataFrame(docs)
+        if fields:
+            page = page.reindex(columns=fields)
+        return page.applymap(self.api.cleanElementsUsingList) if cleanElements else page
+
+    def pages(self, search, fields=None, cleanElements=True):
+        """
+        Yield the cleaned pages of a search as they are fetched.
+
+        Args:
+            search (str): The search query.
+            fields (list, optional): List of fields to include in the response. Defaults to None.
+            cleanElements (bool, optional): Whether to clean elements in lists. Defaults to True.
+
+        Yields:
+            pandas.DataFrame: One page of records.
+        """
+        totalRecords = self.api.getEricPage(search, fields, 0, 1)["response"]["numFound"]
+        starts = iter(range(0, totalRecords, self.rows))
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="eric") as executor:
+            pending = set()
+            for start in starts:
+                pending.add(executor.submit(self._fetchPage, search, fields, start, cleanElements))
+                if len(pending) >= 2 * self.max_workers:
+                    break
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+                    start = next(starts, None)
+                    if start is not None:
+                        pending.add(executor.submit(self._fetchPage, search, fields, start, cleanElements))
+
+    def harvest(self, search, sink, fields=None, cleanElements=True):
+        """
+        Stream every record of a search into ``sink``.
+
+        Args:
+            search (str): The search query.
+            sink (SqliteSink or ParquetSink): Destination of the pages.
+            fields (list, optional): List of fields to include in the response. Defaults to None.
+            cleanElements (bool, optional): Whether to clean elements in lists. Defaults to True.
+
+        Returns:
+            int: Number of records written.
+        """
+        startTime = time.time()
+        n_records = 0
+        for page in self.pages(search, fields, cleanElements):
+            sink.write(page)
+            n_records += len(page)
+        print("harvested", "{:,}".format(n_records), "records in", "{:,.1f}".format(time.time() - startTime), "seconds")
+        return n_records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Harvest ERIC records into SQLite or Parquet.")
+    parser.add_argument("search", help='ERIC search query, e.g. subject:"Problem Solving"')
+    destination = parser.add_mutually_exclusive_group(required=True)
+    destination.add_argument("--sqlite", help="SQLite database to append the records to")
+    destination.add_argument("--parquet", help="Parquet file to write; requires --fields")
+    parser.add_argument("--table", default="eric_records")
+    parser.add_argument("--fields", nargs="+")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--base-url", default="https://api.ies.ed.gov/eric/")
+    args = parser.parse_args()
+
+    if args.parquet and not args.fields:
+        parser.error("--parquet requires --fields")
+    harvester = EricHarvester(
+        EricApi(args.base_url, session=pooledSession(args.workers)), max_workers=args.workers
+    )
+    sink = SqliteSink(args.sqlite, args.table) if args.sqlite else ParquetSink(args.parquet, args.fields)
+    try:
+        harvester.harvest(args.search, sink, fields=args.fields)
+    finally:
+        sink.close()
+
+
+if __name__ == "__main__":
+    main()
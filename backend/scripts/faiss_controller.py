@@ -0,0 +1,296 @@
+import argparse
+import os
+import sqlite3
+import time
+
+import faiss
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+
+def newVectorizer(max_features=1000):
+    """
+    Create the TF-IDF vectorizer used for the ERIC index (same settings as ``notebook_faiss.ipynb``).
+    """
+    return TfidfVectorizer(
+        max_features=max_features,
+        stop_words="english",
+        norm="l2",
+        use_idf=True,
+        smooth_idf=True,
+        sublinear_tf=False,
+        decode_error="ignore",
+        strip_accents="unicode",
+        analyzer="word",
+        ngram_range=(1, 1),
+    )
+
+
+INDEX_KINDS = ("flat", "ivf", "hnsw", "ivfpq")
+
+
+def indexFactoryString(kind, nlist=1024, hnsw_m=32, pq_m=50, pq_nbits=8):
+    """
+    Return the ``faiss.index_factory`` description of an index variant, wrapped in ``IDMap2``.
+
+    Args:
+        kind (str): One of ``INDEX_KINDS``.
+        nlist (int, optional): Number of IVF cells. Defaults to 1024.
+        hnsw_m (int, optional): Neighbours per HNSW node. Defaults to 32.
+        pq_m (int, optional): PQ sub-quantizers; must divide the dimension. Defaults to 50.
+        pq_nbits (int, optional): Bits per PQ code. Defaults to 8.
+
+    Returns:
+        str: The factory string.
+    """
+    specs = {
+        "flat": "Flat",
+        "ivf": "IVF{},Flat".format(nlist),
+        "hnsw": "HNSW{}".format(hnsw_m),
+        "ivfpq": "IVF{},PQ{}x{}".format(nlist, pq_m, pq_nbits),
+    }
+    if kind not in specs:
+        raise ValueError("Unknown index kind '{}'. Choose one of {}.".format(kind, INDEX_KINDS))
+    return "IDMap2," + specs[kind]
+
+
+def setSearchParameters(index, nprobe=None, ef_search=None):
+    """
+    Set the query-time knobs of an IVF (``nprobe``) or HNSW (``efSearch``) index, looking
+    through an ``IndexIDMap`` wrapper. Other index types are left untouched.
+    """
+    inner = faiss.downcast_index(index.index) if hasattr(index, "id_map") else index
+    if nprobe is not None and hasattr(inner, "nprobe"):
+        inner.nprobe = nprobe
+    if ef_search is not None and hasattr(inner, "hnsw"):
+        inner.hnsw.efSearch = ef_search
+    return index
+
+
+def readIndex(path, mmap=True):
+    """
+    Read an index, memory-mapping its data when the index type supports it and falling
+    back to a regular read otherwise.
+    """
+    if mmap:
+        try:
+            return faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError:
+            pass
+    return faiss.read_index(path)
+
+
+def embedDescriptions(vectorizer, descriptions):
+    """
+    Embed texts with a fitted vectorizer as L2-normalized float32 rows.
+
+    Args:
+        vectorizer (TfidfVectorizer): The fitted vectorizer.
+        descriptions (list): Texts to embed.
+
+    Returns:
+        numpy.ndarray: ``(len(descriptions), n_features)`` float32 matrix.
+    """
+    vectors = vectorizer.transform(descriptions).astype(np.float32).toarray()
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def reservoirSample(chunks, size, seed=0):
+    """
+    Draw a uniform sample of ``size`` documents from chunks of ``(ids, documents)`` in one pass.
+
+    Only the sample is held in memory, so the vectorizer can be fitted on a bounded,
+    unbiased subset of a corpus of any size (reservoir sampling, Algorithm R).
+
+    Args:
+        chunks (iterable): Pairs of id array and list of texts.
+        size (int): Number of documents to keep.
+        seed (int, optional): Seed of the replacement draws. Defaults to 0.
+
+    Returns:
+        list: The sampled documents, or every document when there are at most ``size``.
+    """
+    rng = np.random.default_rng(seed)
+    sample, n_seen = [], 0
+    for _, documents in chunks:
+        documents = list(documents)
+        n_fill = max(0, min(size - n_seen, len(documents)))
+        sample.extend(documents[:n_fill])
+        if n_fill < len(documents):
+            # Document number t replaces a random slot with probability size / (t + 1)
+            positions = np.arange(n_seen + n_fill, n_seen + len(documents))
+            slots = rng.integers(0, positions + 1)
+            for offset, slot in zip(np.flatnonzero(slots < size).tolist(), slots[slots < size].tolist()):
+                sample[slot] = documents[n_fill + offset]
+        n_seen += len(documents)
+    return sample
+
+
+class FaissController:
+    """
+    Out-of-core builder for the ERIC FAISS index.
+
+    The vectorizer is fitted on a stream of descriptions (only its sparse counts are held),
+    then the corpus is transformed, normalized in float32 and added to the index one
+    chunk at a time, so peak memory is bounded by the chunk size rather than the corpus.
+    """
+
+    def __init__(self, vectorizer=None, max_features=1000) -> None:
+        self.vectorizer = vectorizer if vectorizer is not None else newVectorizer(max_features)
+
+    def fitVectorizer(self, documents):
+        """
+        Fit the vectorizer on an iterable of texts, which is consumed once.
+        """
+        self.vectorizer.fit(documents)
+        return self.vectorizer
+
+    @property
+    def dim(self):
+        return len(self.vectorizer.vocabulary_)
+
+    def newIndex(self, kind="flat", **params):
+        """
+        Create an empty inner-product index of the given kind (see ``indexFactoryString``).
+        """
+        return faiss.index_factory(self.dim, indexFactoryString(kind, **params), faiss.METRIC_INNER_PRODUCT)
+
+    def trainIndex(self, index, chunks, train_size=100000):
+        """
+        Train an IVF index on up to ``train_size`` vectors taken from the first chunks.
+        """
+        if index.is_trained:
+            return index
+        samples, n_samples = [], 0
+        for _, documents in chunks:
+            samples.append(embedDescriptions(self.vectorizer, documents[:train_size - n_samples]))
+            n_samples += len(samples[-1])
+            if n_samples >= train_size:
+                break
+        index.train(np.vstack(samples))
+        return index
+
+    def addChunks(self, index, chunks, embeddings=None):
+        """
+        Embed and add chunks of ``(ids, documents)`` to ``index``.
+
+        Args:
+            index (faiss.Index): Index to add to; ``ids`` are used when it is an ``IndexIDMap``.
+            chunks (iterable): Pairs of id array and list of texts.
+            embeddings (numpy.ndarray, optional): Writable ``(max id + 1, dim)`` array, e.g. a
+                ``.npy`` memmap, that receives the exact vectors by id. Defaults to None.
+
+        Returns:
+            int: Number of vectors added.
+        """
+        n_added = 0
+        for ids, documents in chunks:
+            vectors = embedDescriptions(self.vectorizer, documents)
+            ids = np.asarray(ids, dtype=np.int64)
+            if hasattr(index, "id_map"):
+                index.add_with_ids(vectors, ids)
+            else:
+                index.add(vectors)
+            if embeddings is not None:
+                embeddings[ids] = vectors
+            n_added += len(vectors)
+        return n_added
+
+    def save(self, index, index_path, vectorizer_path):
+        faiss.write_index(index, index_path)
+        joblib.dump(self.vectorizer, vectorizer_path)
+
+
+def csvChunks(path, chunksize, text_column="description"):
+    """
+    Yield ``(ids, documents)`` from the CSV export. Rows with any missing field are
+    dropped and the remaining rows are numbered in order, as ``notebook_faiss.ipynb`` does.
+    """
+    next_id = 0
+    for frame in pd.read_csv(path, chunksize=chunksize):
+        documents = frame.dropna()[text_column].tolist()
+        yield np.arange(next_id, next_id + len(documents), dtype=np.int64), documents
+        next_id += len(documents)
+
+
+def sqliteChunks(path, table, chunksize, text_column="description"):
+    """
+    Yield ``(ids, documents)`` from the papers table, keyed by their ``id`` column.
+    """
+    connection = sqlite3.connect(path)
+    try:
+        query = 'SELECT id, "{}" FROM "{}" WHERE "{}" IS NOT NULL ORDER BY id'.format(text_column, table, text_column)
+        for frame in pd.read_sql_query(query, connection, chunksize=chunksize):
+            yield frame["id"].to_numpy(dtype=np.int64), frame[text_column].tolist()
+    finally:
+        connection.close()
+
+
+def countRows(chunks):
+    max_id = -1
+    for ids, _ in chunks:
+        if len(ids):
+            max_id = max(max_id, int(np.max(ids)))
+    return max_id + 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the ERIC FAISS index out of core.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--csv", help="CSV export of ERIC records, e.g. database/eric_records.csv")
+    source.add_argument("--sqlite", help="SQLite database, e.g. database/eric_database.db")
+    parser.add_argument("--table", default="papers")
+    parser.add_argument("--chunksize", type=int, default=20000)
+    parser.add_argument("--max-features", type=int, default=1000)
+    parser.add_argument("--vectorizer", default="database/eric_vectorizer.joblib")
+    parser.add_argument("--reuse-vectorizer", action="store_true", help="Load --vectorizer instead of fitting a new one")
+    parser.add_argument(
+        "--fit-size", type=int, default=200000,
+        help="Fit the vectorizer on a uniform sample of this many documents; 0 fits on every document",
+    )
+    parser.add_argument("--output", default="database/eric_index.index")
+    parser.add_argument("--kind", choices=INDEX_KINDS, default="flat")
+    parser.add_argument("--nlist", type=int, default=1024)
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    parser.add_argument("--pq-m", type=int, default=50)
+    parser.add_argument("--train-size", type=int, default=100000)
+    parser.add_argument(
+        "--embeddings",
+        help="Also write the exact vectors to this .npy file (e.g. database/eric_embeddings.npy); "
+        "recommended for ivfpq, whose reconstructions are approximate",
+    )
+    args = parser.parse_args()
+
+    def chunks():
+        if args.csv:
+            return csvChunks(args.csv, args.chunksize)
+        return sqliteChunks(args.sqlite, args.table, args.chunksize)
+
+    startTime = time.time()
+    if args.reuse_vectorizer:
+        controller = FaissController(joblib.load(args.vectorizer))
+    else:
+        controller = FaissController(max_features=args.max_features)
+        if args.fit_size:
+            controller.fitVectorizer(reservoirSample(chunks(), args.fit_size))
+        else:
+            controller.fitVectorizer(document for _, documents in chunks() for document in documents)
+    index = controller.newIndex(args.kind, nlist=args.nlist, hnsw_m=args.hnsw_m, pq_m=args.pq_m)
+    controller.trainIndex(index, chunks(), args.train_size)
+    embeddings = None
+    if args.embeddings:
+        embeddings = np.lib.format.open_memmap(args.embeddings, mode="w+", dtype=np.float32, shape=(countRows(chunks()), controller.dim))
+    n_added = controller.addChunks(index, chunks(), embeddings)
+    controller.save(index, args.output, args.vectorizer)
+    if embeddings is not None:
+        embeddings.flush()
+        # Mark the vectors as newer than the index so EmbeddingStore.fromIndex uses them.
+        os.utime(args.embeddings)
+    print("indexed", "{:,}".format(n_added), "papers in", "{:,.1f}".format(time.time() - startTime), "seconds")
+
+
+if __name__ == "__main__":
+    main()
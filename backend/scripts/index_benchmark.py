@@ -0,0 +1,124 @@
+import argparse
+import json
+import time
+
+import faiss
+import numpy as np
+
+from embedding_store import indexVectors
+from scripts.faiss_controller import INDEX_KINDS, indexFactoryString, setSearchParameters
+
+
+def recallAtK(found, truth):
+    """
+    Mean fraction of the exact top-k neighbours that appear in the approximate top-k.
+    """
+    hits = [len(np.intersect1d(row, truth_row[truth_row >= 0])) for row, truth_row in zip(found, truth)]
+    return float(np.mean(hits)) / truth.shape[1]
+
+
+def benchmarkIndex(kind, vectors, queries, truth, k, nprobe=32, ef_search=128, train_size=100000, **params):
+    """
+    Build one index variant over ``vectors`` and measure it against the exact results.
+
+    Args:
+        kind (str): One of ``INDEX_KINDS``.
+        vectors (numpy.ndarray): ``(n, d)`` float32 corpus; row ``i`` gets id ``i``.
+        queries (numpy.ndarray): ``(q, d)`` float32 queries.
+        truth (numpy.ndarray): ``(q, k)`` exact neighbour ids from the flat index.
+        k (int): Number of neighbours per query.
+        nprobe (int, optional): IVF cells visited per query. Defaults to 32.
+        ef_search (int, optional): HNSW search breadth. Defaults to 128.
+        train_size (int, optional): Vectors used to train IVF variants. Defaults to 100000.
+
+    Returns:
+        dict: Build time, serialized size, batch and single-query latency and recall@k.
+    """
+    startTime = time.perf_counter()
+    index = faiss.index_factory(vectors.shape[1], indexFactoryString(kind, **params), faiss.METRIC_INNER_PRODUCT)
+    if not index.is_trained:
+        sample = np.random.default_rng(0).choice(len(vectors), size=min(train_size, len(vectors)), replace=False)
+        index.train(np.ascontiguousarray(vectors[np.sort(sample)]))
+    for start in range(0, len(vectors), 50000):
+        chunk = np.ascontiguousarray(vectors[start:start + 50000])
+        index.add_with_ids(chunk, np.arange(start, start + len(chunk), dtype=np.int64))
+    build_seconds = time.perf_counter() - startTime
+    setSearchParameters(index, nprobe=nprobe, ef_search=ef_search)
+
+    startTime = time.perf_counter()
+    _, found = index.search(queries, k)
+    batch_seconds = time.perf_counter() - startTime
+
+    single_latencies = []
+    for query in queries[:100]:
+        startTime = time.perf_counter()
+        index.search(query[None, :], k)
+        single_latencies.append(time.perf_counter() - startTime)
+
+    return {
+        "kind": kind,
+        "build_s": build_seconds,
+        "memory_mb": faiss.serialize_index(index).nbytes / 2**20,
+        "batch_ms_per_query": 1000 * batch_seconds / len(queries),
+        "single_p50_ms": 1000 * float(np.percentile(single_latencies, 50)),
+        "single_p99_ms": 1000 * float(np.percentile(single_latencies, 99)),
+        "recall_at_k": recallAtK(found, truth),
+    }
+
+
+def benchmarkIndexes(vectors, kinds=INDEX_KINDS, k=10, n_queries=1000, seed=0, **params):
+    """
+    Compare index variants on recall@k against the exact flat index, build time, size and latency.
+
+    Queries are random corpus rows, so the workload matches "more like this" lookups.
+
+    Returns:
+        list: One result dict per kind (see ``benchmarkIndex``).
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    rows = np.random.default_rng(seed).choice(len(vectors), size=min(n_queries, len(vectors)), replace=False)
+    queries = np.ascontiguousarray(vectors[rows])
+    exact = faiss.IndexFlatIP(vectors.shape[1])
+    exact.add(vectors)
+    _, truth = exact.search(queries, k)
+    return [benchmarkIndex(kind, vectors, queries, truth, k, **params) for kind in kinds]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark FAISS index variants against the exact flat index.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--embeddings", help=".npy matrix of corpus vectors, e.g. database/eric_embeddings.npy")
+    source.add_argument("--index", help="Existing index to read the vectors from, e.g. database/eric_index.index")
+    parser.add_argument("--kinds", nargs="+", choices=INDEX_KINDS, default=list(INDEX_KINDS))
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--nlist", type=int, default=1024)
+    parser.add_argument("--nprobe", type=int, default=32)
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    parser.add_argument("--ef-search", type=int, default=128)
+    parser.add_argument("--pq-m", type=int, default=50)
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    if args.embeddings:
+        vectors = np.load(args.embeddings, mmap_mode="r")
+    else:
+        vectors = indexVectors(faiss.read_index(args.index))
+    results = benchmarkIndexes(
+        vectors, args.kinds, k=args.k, n_queries=args.queries,
+        nlist=args.nlist, nprobe=args.nprobe, hnsw_m=args.hnsw_m, ef_search=args.ef_search, pq_m=args.pq_m,
+    )
+    columns = ["kind", "build_s", "memory_mb", "batch_ms_per_query", "single_p50_ms", "single_p99_ms", "recall_at_k"]
+    print(" ".join("{:>18}".format(column) for column in columns))
+    for result in results:
+        print(" ".join(
+            "{:>18}".format(result[column] if isinstance(result[column], str) else "{:.4f}".format(result[column]))
+            for column in columns
+        ))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import argparse
+
+from sqlalchemy import Index, create_engine
+
+
+def paperIndexes(papers_model):
+    """
+    Secondary indexes of the papers table.
+
+    ``/data`` lists papers by ``counts`` (ties broken by ``id``) within a year range. An
+    index on ``(counts DESC, id DESC, publication_year)`` lets SQLite walk rows already in
+    that order, check the year range from the index itself and stop after one page, and
+    lets keyset pagination seek straight to a ``(counts, id)`` cursor. A leading
+    ``publication_year`` column could only serve the range, not the ordering.
+
+    The API itself now serves ``/data`` from ``PaperMetadata`` and no longer runs this
+    at startup; apply it with this script for SQL clients that page the table directly.
+    """
+    return [
+        Index(
+            "ix_papers_counts_id_year",
+            papers_model.counts.desc(),
+            papers_model.id.desc(),
+            papers_model.publication_year,
+        ),
+    ]
+
+
+def migrate(engine, papers_model):
+    """
+    Create any missing indexes; safe to run repeatedly.
+    """
+    for index in paperIndexes(papers_model):
+        index.create(bind=engine, checkfirst=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Add the secondary indexes used by the API to the papers table.")
+    parser.add_argument("--database", default="database/eric_database.db")
+    args = parser.parse_args()
+
+    from database.db_eric import Papers
+
+    migrate(create_engine("sqlite:///" + args.database), Papers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from scripts.faiss_controller import embedDescriptions
+
+
+class QueryCache:
+    """
+    Small thread-safe LRU cache of recent search results.
+    """
+
+    def __init__(self, max_entries=256) -> None:
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class PaperSearch:
+    """
+    Free-text and "more like this" search over the FAISS index.
+
+    All queries of a request are answered with one batched ``index.search``. Year filters
+    are applied to the aligned ``years`` array on an over-fetched candidate list, and
+    results are cached per query. ``vectorizer`` may be None, in which case only
+    ``similar`` is available.
+    """
+
+    def __init__(self, index, store, vectorizer, years, cache_size=256, overfetch=4) -> None:
+        self.index = index
+        self.store = store
+        self.vectorizer = vectorizer
+        self.years = years
+        self.cache = QueryCache(cache_size)
+        self.overfetch = overfetch
+
+    def _search(self, keys, vectors, k, start_year, end_year, exclude=None):
+        results = [self.cache.get(key) for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            n_fetch = min(k * self.overfetch + (len(exclude[0]) if exclude else 0), self.index.ntotal)
+            distances, indices = self.index.search(np.ascontiguousarray(vectors(missing), dtype=np.float32), n_fetch)
+            for row, i in enumerate(missing):
+                ids, scores = indices[row], distances[row]
+                keep = ids >= 0
+                keep[keep] &= (self.years[ids[keep]] >= start_year) & (self.years[ids[keep]] <= end_year)
+                if exclude:
+                    keep &= ~np.isin(ids, exclude[i])
+                results[i] = (ids[keep][:k], scores[keep][:k])
+                self.cache.put(keys[i], results[i])
+        return results
+
+    def searchText(self, queries, k=20, start_year=1950, end_year=2023):
+        """
+        Find the papers closest to each free-text query.
+
+        Args:
+            queries (list): Query strings.
+            k (int, optional): Results per query. Defaults to 20.
+            start_year (int, optional): First publication year to include. Defaults to 1950.
+            end_year (int, optional): Last publication year to include. Defaults to 2023.
+
+        Returns:
+            list: One ``(ids, scores)`` pair of arrays per query.
+        """
+        keys = [("text", query, k, start_year, end_year) for query in queries]
+        return self._search(keys, lambda rows: embedDescriptions(self.vectorizer, [queries[i] for i in rows]), k, start_year, end_year)
+
+    def similar(self, paper_ids, k=20, start_year=1950, end_year=2023):
+        """
+        Find the nearest neighbours of each paper from its stored vector, excluding the paper itself.
+
+        Args:
+            paper_ids (list): FAISS ids of the source papers.
+            k (int, optional): Results per paper. Defaults to 20.
+            start_year (int, optional): First publication year to include. Defaults to 1950.
+            end_year (int, optional): Last publication year to include. Defaults to 2023.
+
+        Returns:
+            list: One ``(ids, scores)`` pair of arrays per paper.
+        """
+        keys = [("similar", int(paper_id), k, start_year, end_year) for paper_id in paper_ids]
+        exclude = [[paper_id] for paper_id in paper_ids]
+        return self._search(keys, lambda rows: self.store.get([paper_ids[i] for i in rows]), k, start_year, end_year, exclude)
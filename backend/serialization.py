@@ -0,0 +1,40 @@
+import orjson
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+
+from metrics import metrics
+
+PAPER_FIELDS = ("id", "title", "author", "description", "subject", "publication_year", "counts")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson, which also serializes NumPy arrays and scalars natively.
+
+    Endpoints return it directly so FastAPI skips ``jsonable_encoder`` on the payload.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        with metrics.span("serialize"):
+            return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+
+def paperFields(fields, default, required=("id",)):
+    """
+    Resolve a comma-separated ``fields=`` parameter to the ``Papers`` columns to project.
+
+    Args:
+        fields (str): Comma-separated field names, or None for ``default``.
+        default (list): Field names used when ``fields`` is None.
+        required (tuple, optional): Fields always included first. Defaults to ``("id",)``.
+
+    Returns:
+        list: Field names without duplicates.
+    """
+    names = default if fields is None else [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in PAPER_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields {unknown}. Choose from {list(PAPER_FIELDS)}.")
+    return list(dict.fromkeys(list(required) + list(names)))
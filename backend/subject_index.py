@@ -0,0 +1,97 @@
+import os
+
+import numpy as np
+
+from atomic_io import writeAtomically
+
+
+def normalizeSubject(subject):
+    """
+    Normalize a subject term for exact matching: trimmed, whitespace-collapsed and case-folded.
+    """
+    return " ".join(subject.split()).casefold()
+
+
+class SubjectIndex:
+    """
+    Inverted index from each normalized subject to the sorted ids of the papers tagged with it.
+
+    Postings are kept as one concatenated int64 array plus per-subject offsets, which is
+    also the layout of the ``.npz`` file written by ``save``.
+    """
+
+    def __init__(self, terms, offsets, postings) -> None:
+        self.terms = list(terms)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.postings = np.asarray(postings, dtype=np.int64)
+        self._positions = {term: i for i, term in enumerate(self.terms)}
+
+    @classmethod
+    def fromRows(cls, rows):
+        """
+        Build the index from ``(id, subject)`` pairs, where ``subject`` is the comma-separated subject column.
+
+        Args:
+            rows (iterable): Pairs of paper id and subject string (or None).
+
+        Returns:
+            SubjectIndex: The built index.
+        """
+        postings = {}
+        for paper_id, subjects in rows:
+            if not subjects:
+                continue
+            for subject in subjects.split(","):
+                subject = normalizeSubject(subject)
+                if subject:
+                    postings.setdefault(subject, []).append(paper_id)
+        terms = sorted(postings)
+        arrays = [np.unique(np.asarray(postings[term], dtype=np.int64)) for term in terms]
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(array) for array in arrays])
+        flat = np.concatenate(arrays) if arrays else np.empty(0, dtype=np.int64)
+        return cls(terms, offsets, flat)
+
+    @classmethod
+    def fromSession(cls, session, papers_model, batch_size=10000):
+        rows = session.query(papers_model.id, papers_model.subject).yield_per(batch_size)
+        return cls.fromRows(rows)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path, allow_pickle=False)
+        return cls(data["terms"].tolist(), data["offsets"], data["postings"])
+
+    @classmethod
+    def loadOrBuild(cls, path, session, papers_model, source_path=None):
+        """
+        Load the postings file at ``path``, rebuilding it from the database when it is
+        missing or older than ``source_path``.
+        """
+        if os.path.exists(path) and (source_path is None or os.path.getmtime(path) >= os.path.getmtime(source_path)):
+            return cls.load(path)
+        subject_index = cls.fromSession(session, papers_model)
+        subject_index.save(path)
+        return subject_index
+
+    def save(self, path):
+        def write(tmp_path):
+            with open(tmp_path, "wb") as f:
+                np.savez(f, terms=np.asarray(self.terms, dtype=str), offsets=self.offsets, postings=self.postings)
+
+        writeAtomically(write, path)
+
+    def lookup(self, subject):
+        """
+        Return the sorted ids of the papers tagged exactly with ``subject``.
+        """
+        position = self._positions.get(normalizeSubject(subject))
+        if position is None:
+            return np.empty(0, dtype=np.int64)
+        return self.postings[self.offsets[position]:self.offsets[position + 1]]
+
+    def __contains__(self, subject):
+        return normalizeSubject(subject) in self._positions
+
+    def __len__(self):
+        return len(self.terms)
@@ -0,0 +1,143 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class SuggestionSession:
+    """
+    Suggestion scores of one user, stored as a compact float32 array aligned with FAISS ids.
+
+    The ids of the ``top_k`` best scores are kept pre-sorted so the first pages can be
+    served without touching the full score array. Recommenders that can be updated in
+    place also keep their fitted ``model`` and the ``liked_ids`` it was trained on.
+    """
+
+    def __init__(self, scores, top_k=1000) -> None:
+        self.scores = np.ascontiguousarray(scores, dtype=np.float32)
+        self.created_at = time.monotonic()
+        self.top_ids = topK(self.scores, top_k)
+        self.complete = True
+        self.model = None
+        self.liked_ids = None
+
+    @classmethod
+    def fromTopK(cls, ids, scores, n_total):
+        """
+        Build a session from a top-k search result instead of a score for every paper.
+
+        Papers outside ``ids`` get a score of ``-inf`` and are never paged.
+
+        Args:
+            ids (numpy.ndarray): FAISS ids of the results.
+            scores (numpy.ndarray): Scores of the results.
+            n_total (int): Number of papers in the corpus.
+
+        Returns:
+            SuggestionSession: The session.
+        """
+        full_scores = np.full(n_total, -np.inf, dtype=np.float32)
+        full_scores[ids] = scores
+        suggestion_session = cls(full_scores, top_k=len(ids))
+        suggestion_session.complete = False
+        return suggestion_session
+
+    def top(self, k):
+        """
+        Return the ``k`` best ``(id, score)`` pairs in descending score order.
+        """
+        ids = self.top_ids[:k] if k <= len(self.top_ids) or not self.complete else topK(self.scores, k)
+        return [(int(i), float(self.scores[i])) for i in ids]
+
+    def page(self, years, start_year, end_year, skip, limit):
+        """
+        Return the ids of one page of suggestions published between ``start_year`` and ``end_year``.
+
+        The pre-sorted top-k ids are tried first; only pages that reach past them fall
+        back to a partial sort of the year-filtered score array.
+
+        Args:
+            years (numpy.ndarray): Publication year of every paper, aligned with FAISS ids.
+            start_year (int): First year to include.
+            end_year (int): Last year to include.
+            skip (int): Number of matching suggestions to skip.
+            limit (int): Page size.
+
+        Returns:
+            numpy.ndarray: int64 ids of the page, in descending score order.
+        """
+        end = skip + limit
+        top_years = years[self.top_ids]
+        top_ids = self.top_ids[(top_years >= start_year) & (top_years <= end_year)]
+        if len(top_ids) >= end or not self.complete or len(self.top_ids) == len(self.scores):
+            return top_ids[skip:end]
+        candidates = np.flatnonzero((years >= start_year) & (years <= end_year))
+        return candidates[topK(self.scores[candidates], end)[skip:end]]
+
+
+def likedSetKey(liked_ids, **settings):
+    """
+    Canonical hash of a liked set and the settings it is scored with.
+
+    Order and duplicates of ``liked_ids`` do not change the key, so the same set of likes
+    always maps to the same cached result.
+    """
+    canonical = json.dumps({"liked": sorted({int(i) for i in liked_ids}), "settings": settings}, sort_keys=True)
+    return hashlib.sha1(canonical.encode()).hexdigest()
+
+
+def topK(scores, k):
+    """
+    Return the indices of the ``k`` largest scores, sorted by descending score.
+
+    Args:
+        scores (numpy.ndarray): 1-D score array.
+        k (int): Number of indices to return.
+
+    Returns:
+        numpy.ndarray: int64 indices into ``scores``.
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top], kind="stable")].astype(np.int64)
+
+
+class SuggestionStore:
+    """
+    Thread-safe, session-keyed store of SuggestionSession objects with an LRU size cap and a TTL.
+    """
+
+    def __init__(self, max_sessions=256, ttl=3600) -> None:
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, session_id, suggestion_session):
+        with self._lock:
+            self._sessions[session_id] = suggestion_session
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def get(self, session_id):
+        """
+        Return the session stored under ``session_id``, or None if it is missing or expired.
+        """
+        with self._lock:
+            suggestion_session = self._sessions.get(session_id)
+            if suggestion_session is None:
+                return None
+            if time.monotonic() - suggestion_session.created_at > self.ttl:
+                del self._sessions[session_id]
+                return None
+            self._sessions.move_to_end(session_id)
+            return suggestion_session
+
+    def __len__(self):
+        return len(self._sessions)
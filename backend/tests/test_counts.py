@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+
+from counts import SubjectCounts
+from subject_index import normalizeSubject
+
+# (publication year, subjects) of a small corpus
+PAPERS = [
+    (1990, ["Reading"]), (1990, ["Reading", "Writing"]), (1991, ["Writing"]), (1992, ["Reading"]),
+    (1994, ["Reading", "Mathematics"]), (1994, ["Mathematics"]), (1995, ["Writing"]), (1995, ["Mathematics"]),
+]
+FIRST_YEAR, LAST_YEAR = 1990, 1996
+
+
+def legacyFreqDict(papers):
+    """
+    ``eric_counts.json`` layout: per subject, the number of papers published before each
+    stringified year, listed from the subject's first year on.
+    """
+    freq_dict = {}
+    for subject in sorted({subject for _, subjects in papers for subject in subjects}):
+        years = [year for year, subjects in papers if subject in subjects]
+        freq_dict[subject] = {
+            str(year): sum(paper_year < year for paper_year in years) for year in range(min(years), LAST_YEAR + 1)
+        }
+    return freq_dict
+
+
+def legacyCount(freq_dict, subject, start_year, end_year):
+    # utils.getCount before the dense counts, with the string years /count received
+    if subject not in freq_dict:
+        return 0
+    subject_freq = freq_dict[subject]
+    if end_year not in subject_freq:
+        return 0
+    if start_year not in subject_freq:
+        start_year = list(subject_freq.keys())[0]
+    return subject_freq[end_year] - subject_freq[start_year]
+
+
+def histogramCounts(papers):
+    # Normalized subject columns, as scripts.count_builder writes them
+    subjects = sorted({normalizeSubject(subject) for _, subjects in papers for subject in subjects})
+    histogram = np.zeros((LAST_YEAR - FIRST_YEAR + 1, len(subjects)), dtype=np.int64)
+    for year, paper_subjects in papers:
+        for subject in paper_subjects:
+            histogram[year - FIRST_YEAR, subjects.index(normalizeSubject(subject))] += 1
+    return SubjectCounts.fromHistogram(subjects, FIRST_YEAR, histogram)
+
+
+YEAR_PAIRS = [(start, end) for start in range(FIRST_YEAR - 2, LAST_YEAR + 1) for end in range(FIRST_YEAR, LAST_YEAR + 1) if start <= end]
+SUBJECTS = ["Reading", "Writing", "Mathematics", "Science"]
+
+
+@pytest.mark.parametrize("start_year, end_year", YEAR_PAIRS)
+def test_count_matches_the_legacy_json_lookup(start_year, end_year):
+    freq_dict = legacyFreqDict(PAPERS)
+    subject_counts = SubjectCounts.fromDict(freq_dict)
+    expected = [legacyCount(freq_dict, subject, str(start_year), str(end_year)) for subject in SUBJECTS]
+    # The legacy lookup answers 0 when end_year precedes a subject's first year; so do the counts
+    assert subject_counts.count(SUBJECTS, start_year, end_year).tolist() == expected
+
+
+def test_histogram_artifact_counts_like_the_json():
+    json_counts = SubjectCounts.fromDict(legacyFreqDict(PAPERS))
+    npz_counts = histogramCounts(PAPERS)
+    for start_year, end_year in YEAR_PAIRS:
+        assert npz_counts.count(SUBJECTS, start_year, end_year).tolist() == json_counts.count(SUBJECTS, start_year, end_year).tolist()
+
+
+def test_count_many_pairs_each_subject_with_its_years():
+    subject_counts = SubjectCounts.fromDict(legacyFreqDict(PAPERS))
+    subjects = [subject for subject in SUBJECTS for _ in YEAR_PAIRS]
+    starts = [start for _ in SUBJECTS for start, _ in YEAR_PAIRS]
+    ends = [end for _ in SUBJECTS for _, end in YEAR_PAIRS]
+    expected = [subject_counts.count([subject], start, end)[0] for subject, start, end in zip(subjects, starts, ends)]
+    assert subject_counts.countMany(subjects, starts, ends).tolist() == expected
+
+
+def test_subjects_are_matched_and_merged_after_normalization():
+    freq_dict = legacyFreqDict(PAPERS)
+    # A second spelling of Reading, as found in the raw ERIC subject strings
+    freq_dict[" reading "] = {"1993": 0, "1994": 2, "1995": 2, "1996": 2}
+    subject_counts = SubjectCounts.fromDict(freq_dict)
+    expected = legacyCount(freq_dict, "Reading", "1990", "1996") + legacyCount(freq_dict, " reading ", "1990", "1996")
+    assert subject_counts.count(["READING", "  Reading", "reading"], 1990, 1996).tolist() == [expected] * 3
+
+
+def test_years_outside_the_counts_are_clipped():
+    subject_counts = SubjectCounts.fromDict(legacyFreqDict(PAPERS))
+    # Before the first year nothing was published; after the last, nothing more is known
+    assert subject_counts.count(["Reading"], 1900, 1990).tolist() == [0]
+    assert subject_counts.count(["Reading"], 1900, 2100).tolist() == subject_counts.count(["Reading"], FIRST_YEAR, LAST_YEAR).tolist()
+
+
+def test_empty_counts_and_subject_lists():
+    assert SubjectCounts.fromDict({}).count(["Reading"], 1990, 1996).tolist() == [0]
+    assert SubjectCounts.fromDict(legacyFreqDict(PAPERS)).count([], 1990, 1996).tolist() == []
+
+
+def test_mapped_layout_round_trip(tmp_path):
+    subject_counts = SubjectCounts.fromDict(legacyFreqDict(PAPERS))
+    subject_counts.save(str(tmp_path / "eric_counts"))
+    mapped = SubjectCounts.loadMapped(str(tmp_path / "eric_counts"))
+    for start_year, end_year in YEAR_PAIRS:
+        assert mapped.count(SUBJECTS, start_year, end_year).tolist() == subject_counts.count(SUBJECTS, start_year, end_year).tolist()
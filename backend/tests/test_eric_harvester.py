@@ -0,0 +1,119 @@
+import json
+import sqlite3
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import requests
+
+from scripts.eric_api import EricApi
+from scripts.eric_harvester import EricHarvester, SqliteSink, pooledSession
+
+N_RECORDS = 5
+
+
+class StubEric:
+    """
+    In-process stand-in for the ERIC search endpoint.
+
+    Serves ``N_RECORDS`` records paged by ``start``/``rows`` and answers the statuses queued
+    in ``failures[start]`` before the real page, so retries can be observed per page.
+    """
+
+    def __init__(self, failures=None) -> None:
+        self.failures = {start: list(statuses) for start, statuses in (failures or {}).items()}
+        self.requests = Counter()
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                params = parse_qs(urlparse(self.path).query)
+                start, rows = int(params["start"][0]), int(params["rows"][0])
+                with stub.lock:
+                    stub.requests[start, rows] += 1
+                    queued = stub.failures.get(start)
+                    status = queued.pop(0) if queued else 200
+                if status != 200:
+                    self.send_response(status)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                docs = [
+                    {"id": "EJ{:03d}".format(i), "title": "Paper {}".format(i), "subject": ["Reading", "Writing"]}
+                    for i in range(start, min(start + rows, N_RECORDS))
+                ]
+                body = json.dumps({"response": {"numFound": N_RECORDS, "docs": docs}}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = "http://127.0.0.1:{}/".format(self.server.server_address[1])
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def stubHarvester(base_url, rows=2, retries=3):
+    session = pooledSession(pool_size=2, retries=retries, backoff_factor=0)
+    return EricHarvester(EricApi(base_url, session=session), max_workers=2, rows=rows)
+
+
+def test_harvest_pages_through_every_record_into_sqlite(tmp_path):
+    sink = SqliteSink(str(tmp_path / "eric.db"))
+    with StubEric() as stub:
+        try:
+            n_records = stubHarvester(stub.base_url).harvest("subject:Reading", sink, fields=["id", "title", "subject"])
+        finally:
+            sink.close()
+
+    assert n_records == N_RECORDS
+    # One count request, then one request per page of two
+    assert stub.requests == Counter({(0, 1): 1, (0, 2): 1, (2, 2): 1, (4, 2): 1})
+    connection = sqlite3.connect(str(tmp_path / "eric.db"))
+    try:
+        rows = connection.execute("SELECT id, title, subject FROM eric_records ORDER BY id").fetchall()
+    finally:
+        connection.close()
+    assert rows == [("EJ{:03d}".format(i), "Paper {}".format(i), "Reading, Writing") for i in range(N_RECORDS)]
+
+
+def test_harvest_retries_rate_limits_and_server_errors(tmp_path):
+    sink = SqliteSink(str(tmp_path / "eric.db"))
+    with StubEric(failures={0: [429], 2: [503, 500]}) as stub:
+        try:
+            n_records = stubHarvester(stub.base_url).harvest("subject:Reading", sink, fields=["id"])
+        finally:
+            sink.close()
+
+    assert n_records == N_RECORDS
+    # The 429 hits the count request; page 2 succeeds on its third attempt
+    assert stub.requests[0, 1] == 2
+    assert stub.requests[2, 2] == 3
+    assert stub.requests[4, 2] == 1
+    connection = sqlite3.connect(str(tmp_path / "eric.db"))
+    try:
+        assert connection.execute("SELECT COUNT(DISTINCT id) FROM eric_records").fetchone() == (N_RECORDS,)
+    finally:
+        connection.close()
+
+
+def test_harvest_gives_up_after_the_retry_budget():
+    with StubEric(failures={2: [500] * 10}) as stub:
+        harvester = stubHarvester(stub.base_url, retries=2)
+        with pytest.raises(requests.exceptions.RetryError):
+            list(harvester.pages("subject:Reading", ["id"]))
+    assert stub.requests[2, 2] == 3
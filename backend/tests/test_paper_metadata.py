@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from paper_metadata import PaperMetadata
+
+
+def makeMetadata(n_total=60, seed=0):
+    """
+    Metadata over ``n_total`` ids with tied and NULL (-1) counts, missing years and missing rows.
+    """
+    rng = np.random.default_rng(seed)
+    present = rng.random(n_total) < 0.8
+    years = rng.integers(1990, 2000, size=n_total).astype(np.float32)
+    years[rng.random(n_total) < 0.1] = np.nan
+    counts = rng.integers(0, 5, size=n_total).astype(np.int64)
+    counts[rng.random(n_total) < 0.15] = -1
+    years[~present], counts[~present] = np.nan, -1
+    # The order PaperMetadata.build writes: counts, then id, both descending
+    ids = np.flatnonzero(present)
+    by_counts = ids[np.lexsort((-ids, -counts[ids]))]
+    return PaperMetadata(present, years, counts, by_counts, text={})
+
+
+def expectedOrder(paper_metadata, start_year, end_year):
+    ids = [i for i in range(len(paper_metadata)) if paper_metadata.present[i] and start_year <= paper_metadata.years[i] <= end_year]
+    return sorted(ids, key=lambda i: (-paper_metadata.counts[i], -i))
+
+
+def cursorPages(paper_metadata, start_year, end_year, limit, block_size):
+    # Walks the pages as /data's next_cursor does: after the (counts, id) of the last row
+    pages, after = [], None
+    while True:
+        page = paper_metadata.topPage(start_year, end_year, limit=limit, after=after, block_size=block_size).tolist()
+        pages.append(page)
+        if len(page) < limit:
+            return pages
+        after = (int(paper_metadata.counts[page[-1]]), page[-1])
+
+
+@pytest.mark.parametrize("block_size", [1, 4, 65536])
+@pytest.mark.parametrize("start_year, end_year", [(1990, 1999), (1993, 1995), (1997, 1997), (2005, 2010)])
+def test_top_page_skip_paging_matches_the_sorted_order(block_size, start_year, end_year):
+    paper_metadata = makeMetadata()
+    expected = expectedOrder(paper_metadata, start_year, end_year)
+    for limit in (1, 3, 7):
+        for skip in range(0, len(expected) + limit, limit):
+            page = paper_metadata.topPage(start_year, end_year, skip=skip, limit=limit, block_size=block_size)
+            assert page.tolist() == expected[skip:skip + limit]
+
+
+@pytest.mark.parametrize("block_size", [1, 4, 65536])
+@pytest.mark.parametrize("start_year, end_year", [(1990, 1999), (1993, 1995), (1997, 1997)])
+def test_top_page_cursor_paging_matches_skip_paging(block_size, start_year, end_year):
+    paper_metadata = makeMetadata(seed=1)
+    for limit in (1, 3, 7):
+        pages = cursorPages(paper_metadata, start_year, end_year, limit, block_size)
+        for n, page in enumerate(pages):
+            assert page == paper_metadata.topPage(start_year, end_year, skip=n * limit, limit=limit, block_size=block_size).tolist()
+        assert sum(pages, []) == expectedOrder(paper_metadata, start_year, end_year)
+
+
+def test_top_page_cursor_resumes_after_null_counts():
+    paper_metadata = makeMetadata(seed=2)
+    expected = expectedOrder(paper_metadata, 1990, 1999)
+    nulls = [i for i in expected if paper_metadata.counts[i] < 0]
+    assert len(nulls) >= 2
+    after = (-1, nulls[0])
+    page = paper_metadata.topPage(1990, 1999, limit=len(expected), after=after)
+    assert page.tolist() == expected[expected.index(nulls[0]) + 1:]
+
+
+def test_top_page_with_zero_limit_is_empty():
+    paper_metadata = makeMetadata()
+    assert paper_metadata.topPage(1990, 1999, skip=0, limit=0).tolist() == []
+    assert paper_metadata.topPage(1990, 1999, skip=5, limit=0).tolist() == []
+    assert paper_metadata.topPage(1990, 1999, limit=0, after=(2, 10)).tolist() == []
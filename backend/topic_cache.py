@@ -0,0 +1,91 @@
+import hashlib
+import os
+import shutil
+import threading
+from collections import OrderedDict
+
+import joblib
+
+from atomic_io import writeAtomically
+
+
+def indexFingerprint(index_path, index):
+    """
+    Identify one build of the FAISS index, so cached topic models are invalidated when it changes.
+
+    Args:
+        index_path (str): Path the index was read from.
+        index (faiss.Index): The loaded index.
+
+    Returns:
+        str: Fingerprint made of the vector count, dimension and file modification time.
+    """
+    return "{}-{}-{}".format(index.ntotal, index.d, int(os.path.getmtime(index_path)))
+
+
+class TopicModelCache:
+    """
+    Per-subject cache of fitted topic models: an in-memory LRU in front of an on-disk store.
+
+    Entries live under ``directory/<fingerprint>/``; building a cache with a new index
+    fingerprint removes the directories written for older index builds.
+    """
+
+    def __init__(self, directory, fingerprint, max_models=128) -> None:
+        self.directory = os.path.join(directory, fingerprint)
+        self.max_models = max_models
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        for name in os.listdir(directory):
+            if name != fingerprint:
+                shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+    def _path(self, topic):
+        return os.path.join(self.directory, hashlib.sha1(topic.encode("utf-8")).hexdigest() + ".joblib")
+
+    def _remember(self, topic, entry):
+        with self._lock:
+            self._models[topic] = entry
+            self._models.move_to_end(topic)
+            while len(self._models) > self.max_models:
+                self._models.popitem(last=False)
+
+    def get(self, topic):
+        """
+        Return the cached entry for ``topic`` from memory or disk, or None.
+        """
+        with self._lock:
+            if topic in self._models:
+                self._models.move_to_end(topic)
+                return self._models[topic]
+        path = self._path(topic)
+        if not os.path.exists(path):
+            return None
+        entry = joblib.load(path)
+        self._remember(topic, entry)
+        return entry
+
+    def put(self, topic, entry):
+        """
+        Store ``entry`` for ``topic`` in memory and on disk.
+        """
+        path = self._path(topic)
+        writeAtomically(lambda tmp_path: joblib.dump(entry, tmp_path), path)
+        self._remember(topic, entry)
+
+    def getOrBuild(self, topic, build):
+        """
+        Return the cached entry for ``topic``, calling ``build()`` and caching its result on a miss.
+        """
+        entry = self.get(topic)
+        if entry is None:
+            entry = build()
+            self.put(topic, entry)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(self.directory, exist_ok=True)
@@ -1,17 +1,6 @@
-def getCount(freq_dict, subject, start_year, end_year):
-    if subject not in freq_dict:
-        return 0
-    
-    subject_freq = freq_dict[subject]
-    
-    if end_year not in subject_freq:
-        return 0
-    if start_year not in subject_freq:
-        start_year = list(subject_freq.keys())[0]
-    return subject_freq[end_year] - subject_freq[start_year]
+def getCount(subject_counts, subject, start_year, end_year):
+    return int(subject_counts.count([subject], start_year, end_year)[0])
+
+def getAllCount(subject_list, subject_counts, start_year, end_year):
+    return int(subject_counts.count(subject_list, start_year, end_year).sum())
 
-def getAllCount(subject_list, freq_dict, start_year, end_year):
-    all_count = 0
-    for subject in subject_list:
-        all_count += getCount(freq_dict, subject, start_year, end_year)
-    return all_count
\ No newline at end of file
@@ -1,6 +1,7 @@
 import random
+import time
+import uuid
 
-import networkx as nx
 import numpy as np
 import pandas as pd
 import plotly.express as px
@@ -13,8 +14,12 @@ if "start_year" not in st.session_state:
     st.session_state.start_year = 1950
 if "end_year" not in st.session_state:
     st.session_state.end_year = 2023
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
 if "liked_ids" not in st.session_state:
     st.session_state.liked_ids = []
+if "suggestions_version" not in st.session_state:
+    st.session_state.suggestions_version = 0
 if "liked_papers" not in st.session_state:
     st.session_state.liked_papers = []
 if "subjects_list" not in st.session_state:
@@ -27,72 +32,87 @@ def removeLikedPapers():
     st.session_state.liked_ids = []
     st.session_state.liked_papers = []
 def runSuggestionsAlgorithm():
-    trainModel()
-    st.success("Suggestion Algorithm has been run successfully")
+    job = trainModel()
+    progress_bar = st.progress(0.0)
+    while job["status"] in ("queued", "running"):
+        time.sleep(0.5)
+        job = fetchJob(job["job_id"])
+        progress_bar.progress(job["progress"])
+    if job["status"] == "succeeded":
+        st.session_state.suggestions_version += 1
+        st.success("Suggestion Algorithm has been run successfully")
+    else:
+        st.error(f"Suggestion Algorithm {job['status']}: {job['error']}")
 def toggle_favorite(paper_id, paper):
     if paper_id in st.session_state.liked_ids:
         st.session_state.liked_ids.remove(paper_id) if paper_id in st.session_state.liked_ids else None
-        st.session_state.liked_papers.remove(paper) if paper in st.session_state.liked_papers else None
+        st.session_state.liked_papers = [liked for liked in st.session_state.liked_papers if liked["id"] != paper_id]
     else:
         st.session_state.liked_ids.append(paper_id) if paper_id not in st.session_state.liked_ids else None
         st.session_state.liked_papers.append(paper) if paper not in st.session_state.liked_papers else None
-def fetchData(skip, limit, start_year, end_year):
-    url = f"{API_BASE_URL}/data"
-    response = requests.get(
-        url,
+@st.cache_resource
+def getSession():
+    # One pooled connection per worker instead of a new TCP connection per call
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+@st.cache_data(ttl=600, show_spinner=False)
+def cachedPage(view, skip, limit, start_year, end_year, session_id, suggestions_version):
+    # suggestions_version is only part of the cache key, so a new run invalidates old pages
+    response = getSession().get(
+        f"{API_BASE_URL}/page",
         params={
+            "view": view,
             "skip": skip,
             "limit": limit,
-            "start_year": st.session_state.start_year,
-            "end_year": st.session_state.end_year
+            "start_year": start_year,
+            "end_year": end_year,
+            "session_id": session_id
         }
     )
-    if response.status_code == 200:
-        data = response.json()["data"]
-        return data
-    else:
-        st.error("Failed to fetch data")
-        st.stop() 
-def fetch_subject_counts(subject_list):
-    url = f"{API_BASE_URL}/count"
-    response = requests.post(
-        url,
-        json={
-            "subject_list": subject_list,
-            "start_year": st.session_state.start_year,
-            "end_year": st.session_state.end_year
-        }
+    response.raise_for_status()
+    return response.json()["data"]
+@st.cache_data(ttl=600, show_spinner=False)
+def cachedPapers(ids, start_year, end_year):
+    response = getSession().post(
+        f"{API_BASE_URL}/papers",
+        json={"ids": list(ids), "start_year": start_year, "end_year": end_year}
     )
-    if response.status_code == 200:
-        return response.json()
-    else:
-        st.error("Failed to fetch subject counts")
-        st.stop()  # Stop execution if count fetching fails
-def fetchSuggestions(skip, limit):
-    url = f"{API_BASE_URL}/getSuggestions"
-    response = requests.get(
-        url,
-        params={
-            "skip": skip,
-            "limit": limit,
-            "start_year": st.session_state.start_year,
-            "end_year": st.session_state.end_year
-        }
-    )
-    if response.status_code == 200:
-        data = response.json()["data"]
-        return data
-    else:
+    response.raise_for_status()
+    return response.json()["data"]
+def fetchPage(view, skip, limit):
+    try:
+        return cachedPage(
+            view, skip, limit,
+            st.session_state.start_year, st.session_state.end_year,
+            st.session_state.session_id, st.session_state.suggestions_version
+        )
+    except requests.RequestException:
         st.error("Failed to fetch data")
-        st.stop()  
-def fetchClusterSimilarities(subject_list, n_paper):
+        st.stop()
+def fetchData(skip, limit):
+    return fetchPage("top", skip, limit)
+def fetchSuggestions(skip, limit):
+    return fetchPage("suggestions", skip, limit)
+def fetchLikedPapers():
+    if not st.session_state.liked_ids:
+        return []
+    try:
+        return cachedPapers(tuple(st.session_state.liked_ids), st.session_state.start_year, st.session_state.end_year)
+    except requests.RequestException:
+        st.error("Failed to fetch liked papers")
+        st.stop()
+def fetchCluster(subject_list, n_paper, n_iter):
     st.write(subject_list)
     url = f"{API_BASE_URL}/cluster"
-    response = requests.post(
+    response = getSession().post(
         url,
         json={
             "topics": subject_list,
             "n_paper": n_paper,
+            "layout_iterations": n_iter,
             "start_year": st.session_state.start_year,
             "end_year": st.session_state.end_year
         }
@@ -103,128 +123,100 @@ def fetchClusterSimilarities(subject_list, n_paper):
         st.error("Failed to fetch subject counts")
         st.stop()  
 
+def clusterToSimilarities(cluster):
+    similarities = {}
+    for paper, scores in zip(cluster["papers"], cluster["scores"]):
+        title_author = f"{paper['title']}###{paper['author']}"
+        similarities.setdefault(title_author, {}).update(zip(cluster["topics"], scores))
+    return similarities
 
-def plot_paper_topic_network(paper_similarities, n_iter):
-    G = nx.Graph()
 
-    for paper, topics in paper_similarities.items():
-        title, author = paper.split("###")
-        G.add_node(paper, node_type='paper', similarities=topics, title=title, author=author)
-        for topic, weight in topics.items():
-            G.add_node(topic, node_type='topic')
-            G.add_edge(paper, topic, weight=weight)
-    
-    all_topics = list(set(topic for topics in paper_similarities.values() for topic in topics))
-    for topic1 in all_topics:
-        for topic2 in all_topics:
-            if topic1 != topic2:
-                G.add_edge(topic1, topic2, weight=-1000)
+def plot_paper_topic_network(cluster):
+    # Positions come precomputed from /cluster; only the traces are assembled here
+    topics, papers, scores = cluster["topics"], cluster["papers"], np.asarray(cluster["scores"]).reshape(len(cluster["papers"]), len(cluster["topics"]))
+    topic_xy = np.asarray(cluster["layout"]["topics"]).reshape(-1, 2)
+    paper_xy = np.asarray(cluster["layout"]["papers"]).reshape(-1, 2)
+    n_papers, n_topics = len(papers), len(topics)
 
-    def create_plotly_graph(G, paper_nodes, topic_nodes):
-        pos = nx.spring_layout(G, iterations=n_iter, k=0.5/np.sqrt(len(G.nodes())), center=(0, 0))
-
-        edge_x = []
-        edge_y = []
-        for edge in G.edges():
-            x0, y0 = pos[edge[0]]
-            x1, y1 = pos[edge[1]]
-            edge_x.append(x0)
-            edge_x.append(x1)
-            edge_x.append(None)
-            edge_y.append(y0)
-            edge_y.append(y1)
-            edge_y.append(None)
-        
-        edge_trace = go.Scatter(
-            x=edge_x, y=edge_y,
-            line=dict(width=0),
-            hoverinfo='none',
-            mode='lines'
-        )
-        
-        node_x = []
-        node_y = []
-        node_text = []
-        hover_text = []
-        node_color = []
-        for node in G.nodes():
-            x, y = pos[node]
-            node_x.append(x)
-            node_y.append(y)
-            node_color.append('lightblue' if G.nodes[node]['node_type'] == 'paper' else 'red')
-            if G.nodes[node]['node_type'] == 'paper':
-                title = G.nodes[node]['title']
-                author = G.nodes[node]['author']
-                # Add author text above paper node
-                author_text = f"<b>{author}</b>"
-                hover_text.append(f"{title}<br>Author: {author}<br>({G.nodes[node]['similarities']})")
-                node_text.append(author_text)
-            else:
-                node_text.append(node)
-                hover_text.append(node)
-        
-        node_trace = go.Scatter(
-            x=node_x, y=node_y,
-            mode='markers+text',
-            text=node_text,
-            textposition="top center",
-            hoverinfo='text',
-            hovertext=hover_text,
-            marker=dict(
-                showscale=True,
-                colorscale='YlGnBu',
-                colorbar=dict(
-                    thickness=15,
-                    title='Node Connections',
-                    xanchor='left',
-                    titleside='right'
-                ),
-                color=node_color,
-                size=20,
-                line_width=2
-            )
-        )
-        
-        node_adjacencies = []
-        for node, adjacencies in enumerate(G.adjacency()):
-            node_adjacencies.append(len(adjacencies[1]))
-        node_trace.marker.color = node_adjacencies
-        
-        fig = go.Figure(data=[edge_trace, node_trace],
-                        layout=go.Layout(
-                            title='Network Graph Visualization',
-                            titlefont_size=16,
-                            showlegend=False,
-                            hovermode='closest',
-                            margin=dict(b=20,l=5,r=5,t=40),
-                            annotations=[],
-                            xaxis=dict(showgrid=False, zeroline=False),
-                            yaxis=dict(showgrid=False, zeroline=False))
-                    )
-        return fig
+    # One segment per paper-topic pair, separated by NaN gaps
+    segments = np.full((n_papers, n_topics, 3, 2), np.nan)
+    segments[:, :, 0] = paper_xy[:, None, :]
+    segments[:, :, 1] = topic_xy[None, :, :]
+    edge_trace = go.Scatter(
+        x=segments[..., 0].ravel(), y=segments[..., 1].ravel(),
+        line=dict(width=0),
+        hoverinfo='none',
+        mode='lines'
+    )
 
+    node_xy = np.concatenate([paper_xy, topic_xy])
+    node_text = [f"<b>{paper['author']}</b>" for paper in papers] + list(topics)
+    hover_text = [
+        f"{paper['title']}<br>Author: {paper['author']}<br>({dict(zip(topics, paper_scores))})"
+        for paper, paper_scores in zip(papers, scores.tolist())
+    ] + list(topics)
+    # Papers link to every topic, so each topic links to every paper
+    node_adjacencies = [n_topics] * n_papers + [n_papers] * n_topics
 
-    paper_nodes = [node for node, data in G.nodes(data=True) if data['node_type'] == 'paper']
-    topic_nodes = [node for node, data in G.nodes(data=True) if data['node_type'] == 'topic']
+    node_trace = go.Scatter(
+        x=node_xy[:, 0], y=node_xy[:, 1],
+        mode='markers+text',
+        text=node_text,
+        textposition="top center",
+        hoverinfo='text',
+        hovertext=hover_text,
+        marker=dict(
+            showscale=True,
+            colorscale='YlGnBu',
+            colorbar=dict(
+                thickness=15,
+                title='Node Connections',
+                xanchor='left',
+                titleside='right'
+            ),
+            color=node_adjacencies,
+            size=20,
+            line_width=2
+        )
+    )
 
-    fig = create_plotly_graph(G, paper_nodes, topic_nodes)
-    
+    fig = go.Figure(data=[edge_trace, node_trace],
+                    layout=go.Layout(
+                        title='Network Graph Visualization',
+                        titlefont_size=16,
+                        showlegend=False,
+                        hovermode='closest',
+                        margin=dict(b=20,l=5,r=5,t=40),
+                        annotations=[],
+                        xaxis=dict(showgrid=False, zeroline=False),
+                        yaxis=dict(showgrid=False, zeroline=False))
+                )
     st.plotly_chart(fig, use_container_width=True)
 
 
-
-
-
-
-
 def trainModel():
-    url = f"{API_BASE_URL}/trainModel"
-    response = requests.post(
+    url = f"{API_BASE_URL}/jobs/trainModel"
+    response = getSession().post(
         url,
         json = {
-            "liked": st.session_state.liked_ids
+            "liked": st.session_state.liked_ids,
+            "session_id": st.session_state.session_id,
+            "mode": st.session_state.suggestion_mode
         }
     )
+    if response.status_code == 200:
+        return response.json()
+    else:
+        st.error("Failed to start the suggestion algorithm")
+        st.stop()
+
+def fetchJob(job_id):
+    response = getSession().get(f"{API_BASE_URL}/jobs/{job_id}")
+    if response.status_code == 200:
+        return response.json()
+    else:
+        st.error("Failed to fetch job status")
+        st.stop()
 
 def topPapers():
     st.markdown(
@@ -237,7 +229,7 @@ def topPapers():
     items_per_page = 20
     skip = (page_num - 1) * items_per_page
     
-    data = fetchData(skip, items_per_page, st.session_state.start_year, st.session_state.end_year)
+    data = fetchData(skip, items_per_page)
     
     for paper in data:
         if paper["id"] in st.session_state.liked_ids:
@@ -261,16 +253,24 @@ def topPapers():
             unsafe_allow_html=True,
         )
 
-        subject_counts = fetch_subject_counts(paper['subject'].split(","))
-
         st.subheader("Subject Bar Chart")
-        st.bar_chart(subject_counts)
+        st.bar_chart(paper["subject_counts"])
         st.write("---")
 
 def suggested_papers():
     st.markdown(
         "<h1 style='text-align: center;'>Suggested Papers</h1>", unsafe_allow_html=True
     )
+    st.session_state.suggestion_mode = st.selectbox(
+        "Suggestion mode",
+        options=["forest", "incremental", "centroid", "knn"],
+        format_func=lambda mode: {
+            "forest": "Random forest (slow, accurate)",
+            "incremental": "Incremental (fast, updates the previous model)",
+            "centroid": "Centroid (fast)",
+            "knn": "Nearest neighbours (fast)",
+        }[mode]
+    )
     st.button("Run Suggestion Algorithm", on_click=runSuggestionsAlgorithm)
     
     page_num = st.sidebar.number_input("Page", min_value=1, value=1)
@@ -302,10 +302,8 @@ def suggested_papers():
             unsafe_allow_html=True,
         )
 
-        subject_counts = fetch_subject_counts(paper['subject'].split(","))
-
         st.subheader("Subject Bar Chart")
-        st.bar_chart(subject_counts)
+        st.bar_chart(paper["subject_counts"])
         st.write("---")
 def liked_papers():
     st.markdown(
@@ -316,7 +314,7 @@ def liked_papers():
     
     page_num = st.sidebar.number_input("Page", min_value=1, value=1)
     
-    for paper in st.session_state.liked_papers:
+    for paper in fetchLikedPapers():
         if paper["id"] in st.session_state.liked_ids:
             heart_color = "red"
         else:
@@ -338,10 +336,8 @@ def liked_papers():
             unsafe_allow_html=True,
         )
 
-        subject_counts = fetch_subject_counts(paper['subject'].split(","))
-
         st.subheader("Subject Bar Chart")
-        st.bar_chart(subject_counts)
+        st.bar_chart(paper["subject_counts"])
         st.write("---")
 
 def clusterPapers():
@@ -349,14 +345,14 @@ def clusterPapers():
 
     selected_topics = st.multiselect("Select topics", st.session_state.subjects_list)
     
-    n_iter = st.number_input("Number of iterations", min_value=10, max_value=1000000, value=1000, step=10)
+    n_iter = st.number_input("Number of iterations", min_value=10, max_value=5000, value=300, step=10)
     n_paper = st.number_input("Number of papers", min_value=1, max_value=1000000, value=5, step=1)
 
     if st.button("Cluster"):
-        cluster_similarities = fetchClusterSimilarities(selected_topics, n_paper)
+        cluster = fetchCluster(selected_topics, n_paper, n_iter)
         st.success("Clustering completed!")  
-        st.write(cluster_similarities)
-        plot_paper_topic_network(cluster_similarities, n_iter)
+        st.write(clusterToSimilarities(cluster))
+        plot_paper_topic_network(cluster)
         st.success("Clustering completed!")  
 
 # Navigation